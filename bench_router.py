@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк маршрутизации апдейтов: поиск обработчика по состоянию/кнопке
+и проверка роли для всех существующих состояний бота.
+Обработчики заменены пустыми, роль берётся из памяти - измеряется только роутер.
+
+Использование: python bench_router.py [повторов_на_состояние]
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+import bot
+from router import Route, RoleCheck, dispatch
+
+
+async def noop(update, context):
+    pass
+
+
+def stub_routes(routes: dict) -> dict:
+    """Те же ключи и роли, обработчики - пустые"""
+    return {key: Route(noop, route.role) for key, route in routes.items()}
+
+
+async def bench_table(name: str, routes: dict, iterations: int, role: str):
+    routes = stub_routes(routes)
+    loads = 0
+
+    async def load_role(user_id):
+        nonlocal loads
+        loads += 1
+        return role
+
+    print(f"{name} ({len(routes)} маршрутов):")
+    for key in routes:
+        context = SimpleNamespace(user_data={'state': key})
+        loads = 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await dispatch(routes, key, None, context, RoleCheck(1, load_role))
+        elapsed = time.perf_counter() - started
+        print(
+            f"  {key:<24} {elapsed / iterations * 1e6:6.2f} мкс/апдейт | "
+            f"загрузок роли на апдейт: {loads / iterations:.0f}"
+        )
+
+
+async def main(iterations: int):
+    print(f"🏁 Бенчмарк роутера: {iterations} апдейтов на состояние, роль admin\n")
+    await bench_table("Кнопки", bot.CALLBACK_ROUTES, iterations, 'admin')
+    await bench_table("Текст", bot.TEXT_ROUTES, iterations, 'admin')
+    await bench_table("Фото", bot.PHOTO_ROUTES, iterations, 'admin')
+    await bench_table("Контакт", bot.CONTACT_ROUTES, iterations, 'admin')
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    asyncio.run(main(iterations))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Бенчмарк задержки записи при оформлении покупки: с профилем хранилища и без.
+Каждая покупка - одна транзакция (начисление баллов + запись в payments),
+как в PaymentService.record_payment.
+
+Использование: python bench_storage.py [количество_покупок]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import storage
+from migrations import migrate
+
+USERS = 1000
+
+CREDIT = text(
+    "UPDATE users SET loyalty_points = loyalty_points + :points "
+    "WHERE telegram_id = :telegram_id RETURNING id, loyalty_points"
+)
+INSERT_PAYMENT = text(
+    "INSERT INTO payments (client_id, seller_id, amount, points_earned, points_spent, created_at) "
+    "VALUES (:client_id, 1, :amount, :points, 0, CURRENT_TIMESTAMP)"
+)
+
+
+async def run_checkouts(db_path: str, count: int, enabled: bool) -> list:
+    """Выполнить count покупок и вернуть задержку каждой в секундах"""
+    url = f'sqlite+aiosqlite:///{db_path}'
+    engine = storage.install(
+        create_async_engine(url, **storage.engine_options(url, enabled)), enabled
+    )
+    await migrate(engine)
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("INSERT INTO users (telegram_id, role, loyalty_points) VALUES (:telegram_id, 'client', 0)"),
+            [{'telegram_id': i} for i in range(1, USERS + 1)]
+        )
+
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        async with engine.begin() as conn:
+            client = (await conn.execute(
+                CREDIT, {'points': 1.5, 'telegram_id': i % USERS + 1}
+            )).first()
+            await conn.execute(INSERT_PAYMENT, {'client_id': client.id, 'amount': 150, 'points': 1.5})
+        latencies.append(time.perf_counter() - started)
+
+    await engine.dispose()
+    return latencies
+
+
+def report(name: str, latencies: list):
+    latencies_ms = sorted(x * 1000 for x in latencies)
+    p95 = latencies_ms[int(len(latencies_ms) * 0.95) - 1]
+    p99 = latencies_ms[int(len(latencies_ms) * 0.99) - 1]
+    print(
+        f"{name:<16} среднее {statistics.mean(latencies_ms):7.3f} мс | "
+        f"p50 {statistics.median(latencies_ms):7.3f} мс | p95 {p95:7.3f} мс | "
+        f"p99 {p99:7.3f} мс | {len(latencies) / sum(latencies):8.1f} покупок/с"
+    )
+
+
+async def main(count: int):
+    print(f"🏁 Бенчмарк записи покупки: {count} транзакций\n")
+    with tempfile.TemporaryDirectory() as tmp:
+        default = await run_checkouts(os.path.join(tmp, 'default.db'), count, enabled=False)
+        tuned = await run_checkouts(os.path.join(tmp, 'tuned.db'), count, enabled=True)
+    report("Без профиля", default)
+    report("С профилем", tuned)
+    print(f"\n⚡ Ускорение: x{statistics.mean(default) / statistics.mean(tuned):.1f}")
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    asyncio.run(main(count))
@@ -0,0 +1,70 @@
+"""
+Ежедневная рассылка поздравлений с днём рождения
+"""
+
+import os
+import time
+import logging
+from telegram.ext import ContextTypes
+
+from models import UserModel, BirthdayMessageModel
+from sender import send_many, send_with_retry
+
+logger = logging.getLogger(__name__)
+
+BIRTHDAY_BATCH_SIZE = int(os.getenv('BIRTHDAY_BATCH_SIZE', '500'))
+
+
+async def _recipients():
+    """Поток telegram_id именинников (читается из БД пачками)"""
+    async for batch in UserModel.iter_birthday_recipients(batch_size=BIRTHDAY_BATCH_SIZE):
+        for telegram_id in batch:
+            yield telegram_id
+
+
+async def send_birthday_greetings(context: ContextTypes.DEFAULT_TYPE):
+    """Отправка поздравлений именинникам"""
+    birthday_msg = await BirthdayMessageModel.get_birthday_message()
+
+    if not birthday_msg or not birthday_msg.message_text:
+        logger.warning("Настройки рассылки ДР не настроены")
+        return
+
+    bot = context.bot
+    started = time.monotonic()
+    recipients = _recipients()
+    sent = 0
+    failed = 0
+
+    def on_result(chat_id, result, error):
+        if error:
+            logger.error(f"Ошибка отправки ДР поздравления {chat_id}: {error}")
+
+    photo = birthday_msg.photo_file_id
+    if photo:
+        # Первое фото отправляем отдельно и дальше переиспользуем file_id из ответа
+        async for chat_id in recipients:
+            try:
+                message = await send_with_retry(bot.send_photo, chat_id, photo=photo,
+                                                caption=birthday_msg.message_text)
+                sent += 1
+                if message and message.photo:
+                    photo = message.photo[-1].file_id
+                break
+            except Exception as e:
+                failed += 1
+                on_result(chat_id, None, e)
+        stats = await send_many(bot.send_photo, recipients, on_result=on_result,
+                                photo=photo, caption=birthday_msg.message_text)
+    else:
+        stats = await send_many(bot.send_message, recipients, on_result=on_result,
+                                text=birthday_msg.message_text)
+
+    sent += stats.sent
+    failed += stats.failed
+    elapsed = time.monotonic() - started
+    if sent or failed:
+        logger.info(
+            f"Отправлено {sent} поздравлений с ДР, ошибок {failed}, "
+            f"{elapsed:.1f} с ({(sent + failed) / elapsed if elapsed > 0 else 0:.1f} сообщ./с)"
+        )
@@ -0,0 +1,1150 @@
+import os
+import math
+import logging
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, TypeHandler, filters, ContextTypes
+from dotenv import load_dotenv
+
+from models import UserModel, PaymentModel, DailySalesModel, PointsLedgerModel, BirthdayMessageModel, EXPORTS, to_cents
+from payment_service import PaymentService
+from broadcast import start_broadcast, resume_broadcasts, stop_broadcasts
+from media_cache import send_cached_photo
+from persistence import DBPersistence
+from session_store import session_store, SESSION_SWEEP_INTERVAL
+from update_processor import PerUserUpdateProcessor
+from birthday import send_birthday_greetings
+from expiry import expire_points, POINTS_EXPIRY_MONTHS
+from export import start_export, stop_export, export_running
+from router import Route, RoleCheck, dispatch, get_state, set_state
+from roles import role_index
+
+# Загрузка переменных окружения
+load_dotenv()
+
+# Настройка логирования
+logging.basicConfig(
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+
+# Константы
+BOT_TOKEN = os.getenv('BOT_TOKEN', '8570438178:AAEW3bEsIdF9iwVjA3Q1sFo5w1NrCyuJVpQ')
+POINTS_PER_RUBLE = 0.01  # 1% от суммы покупки в баллы
+LOGO_PATH = 'photo_2025-12-12_18-51-23.jpg'
+HISTORY_PAGE_SIZE = 10  # Записей на странице истории покупок / продаж
+MAX_PAYMENT_AMOUNT = 1_000_000  # Максимальная сумма одной покупки, руб.
+MAX_POINTS = 1_000_000  # Максимум баллов в одной операции
+
+# Вспомогательные функции
+async def get_role(user_id: int):
+    """Роль пользователя для проверки доступа (из индекса, без запроса к базе)"""
+    return role_index.role(user_id)
+
+async def staff_user(update: Update):
+    """
+    Запись users действующего сотрудника (продавец, админ).
+    Админ из ADMIN_IDS может ни разу не нажать /start - тогда запись создаётся здесь,
+    иначе оплата не получит seller_id, а рассылка - sender_id.
+    """
+    tg_user = update.effective_user
+    user = await UserModel.get_user(tg_user.id)
+    if user is None:
+        user = await UserModel.get_or_create_user(
+            tg_user.id, tg_user.username, tg_user.first_name, tg_user.last_name
+        )
+    return user
+
+def parse_amount(text: str, limit: float):
+    """
+    Число из сообщения для операций с баллами: конечное, от 0.01 до limit.
+    None - вне диапазона (inf, 1e400, 0.001 и т.п.), ValueError - не число.
+    """
+    value = float(text.replace(',', '.'))
+    if not math.isfinite(value) or value > limit or to_cents(value) <= 0:
+        return None
+    return value
+
+# Обработчики команд
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик /start"""
+    user = update.effective_user
+    
+    # Создаем пользователя
+    db_user = await UserModel.get_or_create_user(
+        telegram_id=user.id,
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name
+    )
+    
+    # Отправляем логотип
+    try:
+        await send_cached_photo(
+            update.message.reply_photo,
+            LOGO_PATH,
+            caption="🎌 KOREJAPY 🎌\nМагазин аниме в Краснодаре"
+        )
+    except Exception as e:
+        logger.error(f"Ошибка отправки логотипа: {e}")
+    
+    # Проверка ролей и автоматическая регистрация админов/продавцов
+    staff_role = role_index.username_role(user.username)
+    if staff_role == 'admin':
+        if db_user.role not in ['admin', 'creator']:
+            await UserModel.update_role(user.id, 'admin')
+        # Админы автоматически зарегистрированы
+        if not db_user.is_registered:
+            await UserModel.set_registered(user.id)
+        welcome_text = f"👑 Добро пожаловать, @{user.username}!\nИспользуйте /menu"
+        await update.message.reply_text(welcome_text)
+    elif staff_role == 'seller':
+        if db_user.role not in ['seller', 'admin', 'creator']:
+            await UserModel.update_role(user.id, 'seller')
+        # Продавцы автоматически зарегистрированы
+        if not db_user.is_registered:
+            await UserModel.set_registered(user.id)
+        welcome_text = f"🛍️ Добро пожаловать, @{user.username}!\nИспользуйте /menu"
+        await update.message.reply_text(welcome_text)
+    else:
+        # Для клиентов - обязательная регистрация
+        # Проверяем is_registered (может быть None, 0 или False)
+        if not db_user.is_registered or db_user.is_registered == 0:
+            keyboard = [
+                [InlineKeyboardButton("📝 Зарегистрироваться", callback_data="start_registration")]
+            ]
+            reply_markup = InlineKeyboardMarkup(keyboard)
+            await update.message.reply_text(
+                "📝 Для использования бота необходимо пройти регистрацию.\n\n"
+                "Это займет всего минуту!",
+                reply_markup=reply_markup
+            )
+        else:
+            welcome_text = "✨ Добро пожаловать в Korejapy!\n\nИспользуйте /menu"
+            await update.message.reply_text(welcome_text)
+
+async def menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Главное меню"""
+    user_id = update.effective_user.id
+    user = await UserModel.get_user(user_id)
+    
+    if not user:
+        if update.message:
+            await update.message.reply_text("Сначала используйте /start")
+        return
+    
+    keyboard = [
+        [InlineKeyboardButton("👤 Мой профиль", callback_data="my_profile")],
+        [InlineKeyboardButton("📊 Мой баланс", callback_data="balance")],
+    ]
+    
+    # Команды для клиентов
+    if user.role == 'client':
+        keyboard.append([InlineKeyboardButton("💸 Обменять баллы", callback_data="exchange_points")])
+        keyboard.append([InlineKeyboardButton("🧾 История покупок", callback_data="purchases")])
+    
+    # Команды для продавцов и админов
+    if user.role in ['seller', 'admin', 'creator']:
+        keyboard.append([InlineKeyboardButton("💰 Добавить оплату", callback_data="add_payment")])
+        keyboard.append([InlineKeyboardButton("💸 Списать баллы", callback_data="spend_points_seller")])
+        keyboard.append([InlineKeyboardButton("📈 Мои продажи", callback_data="sales")])
+    
+    # Команды для админов
+    if user.role in ['admin', 'creator']:
+        keyboard.append([InlineKeyboardButton("👥 Управление ролями", callback_data="manage_roles")])
+        keyboard.append([InlineKeyboardButton("📢 Массовая рассылка", callback_data="broadcast")])
+        keyboard.append([InlineKeyboardButton("🎂 Настройка рассылки ДР", callback_data="birthday_settings")])
+        keyboard.append([InlineKeyboardButton("📊 Статистика продаж", callback_data="stats")])
+    
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    # Отправляем новое сообщение и сохраняем его ID (chat_data переживает перезапуск)
+    if update.message:
+        msg = await update.message.reply_text("📋 Главное меню:", reply_markup=reply_markup)
+        context.chat_data['menu_message_id'] = msg.message_id
+    elif update.callback_query:
+        try:
+            await update.callback_query.edit_message_text("📋 Главное меню:", reply_markup=reply_markup)
+        except:
+            msg = await update.callback_query.message.reply_text("📋 Главное меню:", reply_markup=reply_markup)
+            context.chat_data['menu_message_id'] = msg.message_id
+
+async def balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показать баланс"""
+    user_id = update.effective_user.id
+    user = await UserModel.get_user(user_id)
+    
+    if user:
+        await update.message.reply_text(
+            f"💰 Ваш баланс: {user.loyalty_points:.2f} баллов"
+        )
+    else:
+        await update.message.reply_text("Пользователь не найден")
+
+# Функция my_qr удалена - больше не используется QR код
+
+# ===== Кнопки =====
+
+async def cb_start_registration(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Регистрация"""
+    await update.callback_query.edit_message_text(
+        "📝 Регистрация профиля\n\n"
+        "Шаг 1/3: Введите ваше имя или ФИО\n"
+        "Например: Иван Петров или ivan123"
+    )
+    set_state(context, 'registration_name')
+
+async def cb_my_profile(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Мой профиль"""
+    query = update.callback_query
+    user = await UserModel.get_user(query.from_user.id)
+    if user and user.is_registered:
+        from datetime import datetime
+        birth_date_formatted = "Не указана"
+        if user.birth_date:
+            try:
+                dt = datetime.strptime(user.birth_date, '%Y-%m-%d')
+                birth_date_formatted = dt.strftime('%d.%m.%Y')
+            except:
+                birth_date_formatted = user.birth_date
+        
+        profile_text = (
+            f"👤 Ваш профиль\n\n"
+            f"Имя: {user.profile_name or 'Не указано'}\n"
+            f"Телефон: {user.phone_number or 'Не указан'}\n"
+            f"Дата рождения: {birth_date_formatted}\n"
+            f"💰 Баллов: {user.loyalty_points:.2f}\n"
+            f"ID: {user.telegram_id}"
+        )
+        # Добавляем кнопки
+        keyboard = [
+            [InlineKeyboardButton("✏️ Изменить имя", callback_data="edit_name")],
+            [InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]
+        ]
+        await query.edit_message_text(profile_text, reply_markup=InlineKeyboardMarkup(keyboard))
+    else:
+        await query.edit_message_text("Профиль не заполнен. Используйте /start для регистрации")
+
+async def cb_edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Изменить имя"""
+    keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="my_profile")]]
+    await update.callback_query.edit_message_text(
+        "✏️ Изменение имени\n\n"
+        "Введите новое имя:",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    set_state(context, 'editing_name')
+    logger.info(f"Пользователь {update.effective_user.id} начал изменение имени")
+
+async def cb_skip_birthday_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Пропустить фото при настройке рассылки ДР"""
+    if get_state(context) == 'birthday_photo':
+        await save_birthday_without_photo(update.callback_query.edit_message_text, update.effective_user.id, context)
+
+async def cb_back_to_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Кнопка "Назад в меню\""""
+    await menu(update, context)
+
+async def cb_balance(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Баланс"""
+    user = await UserModel.get_user(update.effective_user.id)
+    if user:
+        keyboard = [[InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]]
+        await update.callback_query.edit_message_text(
+            f"💰 Ваш баланс: {user.loyalty_points:.2f} баллов",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+
+async def cb_exchange_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обмен баллов для клиента"""
+    user = await UserModel.get_user(update.effective_user.id)
+    if user:
+        keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")]]
+        await update.callback_query.edit_message_text(
+            f"💸 Обмен баллов на скидку\n\n"
+            f"Ваш баланс: {user.loyalty_points:.2f} баллов\n"
+            f"Курс: 5 баллов = 1 рубль\n\n"
+            "Введите количество баллов для обмена:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        set_state(context, 'exchange_points')
+
+async def cb_spend_points_seller(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Списание баллов продавцом (по username/телефону/ID)"""
+    keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")]]
+    await update.callback_query.edit_message_text(
+        "💸 Списание баллов\n\n"
+        "Введите данные клиента:\n"
+        "- Username (например: @ivan или ivan)\n"
+        "- Номер телефона (или последние 4+ цифры)\n"
+        "- Имя клиента\n"
+        "- ID клиента",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    set_state(context, 'spend_client')
+
+async def cb_add_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Добавление оплаты"""
+    keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")]]
+    await update.callback_query.edit_message_text(
+        "💰 Добавление оплаты\n\n"
+        "Шаг 1/2: Введите данные клиента:\n"
+        "- Username (@ivan или ivan)\n"
+        "- Номер телефона (или последние 4+ цифры)\n"
+        "- Имя клиента\n"
+        "- ID клиента",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    set_state(context, 'payment_client')
+
+async def cb_pick_client(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Выбор клиента из найденных (кнопка pick_client:<telegram_id>)"""
+    query = update.callback_query
+    client = await UserModel.get_user(int(query.data.split(':', 1)[1]))
+    if not client:
+        await query.edit_message_text("❌ Клиент не найден\n\nПопробуйте ещё раз")
+        return
+    state = get_state(context)
+    if state == 'payment_client':
+        await select_payment_client(query.edit_message_text, context, client)
+    elif state == 'spend_client':
+        await select_spend_client(query.edit_message_text, context, client)
+
+def format_payment(payment, client_name: str, as_seller: bool) -> str:
+    """Строка истории: дата, (клиент), сумма и баллы"""
+    from datetime import timezone
+    created = payment.created_at.replace(tzinfo=timezone.utc).astimezone()
+    line = created.strftime('%d.%m.%Y %H:%M')
+    if as_seller:
+        line += f" · {client_name or 'Без имени'}"
+    if payment.points_spent:
+        line += f" · 💸 списано {payment.points_spent:.2f} баллов"
+    else:
+        line += f" · {payment.amount:g}₽ · +{payment.points_earned:.2f} баллов"
+    return line
+
+async def show_history(update: Update, context: ContextTypes.DEFAULT_TYPE, as_seller: bool):
+    """Страница истории; callback_data '<ключ>:<id последней записи>' - следующая страница"""
+    query = update.callback_query
+    user = await UserModel.get_user(query.from_user.id)
+    if not user:
+        await query.edit_message_text("Сначала используйте /start")
+        return
+    
+    key, _, cursor = query.data.partition(':')
+    before_id = int(cursor) if cursor else None
+    rows = await PaymentModel.get_history(user.id, as_seller, before_id, HISTORY_PAGE_SIZE + 1)
+    has_more = len(rows) > HISTORY_PAGE_SIZE
+    rows = rows[:HISTORY_PAGE_SIZE]
+    
+    title = "📈 Мои продажи" if as_seller else "🧾 История покупок"
+    if rows:
+        text = title + "\n\n" + "\n".join(format_payment(p, name, as_seller) for p, name in rows)
+    else:
+        text = title + "\n\n" + ("Больше записей нет" if before_id else "Пока нет ни одной записи")
+    
+    navigation = []
+    if before_id:
+        navigation.append(InlineKeyboardButton("⏮ В начало", callback_data=key))
+    if has_more:
+        navigation.append(InlineKeyboardButton("Далее ▶️", callback_data=f"{key}:{rows[-1][0].id}"))
+    keyboard = [navigation] if navigation else []
+    keyboard.append([InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")])
+    await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+
+async def cb_purchases(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """История покупок клиента"""
+    await show_history(update, context, as_seller=False)
+
+async def cb_sales(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Продажи продавца"""
+    await show_history(update, context, as_seller=True)
+
+async def sales_stats_text() -> str:
+    """Продажи по продавцам за сегодня / неделю / месяц из сводки daily_sales"""
+    from datetime import date, timedelta
+    today = date.today()
+    periods = [
+        ("Сегодня", today),
+        ("За неделю", today - timedelta(days=today.weekday())),
+        ("За месяц", today.replace(day=1)),
+    ]
+    rows = await DailySalesModel.get_since(min(start for _, start in periods).isoformat())
+    
+    text = "📊 Статистика продаж\n"
+    for title, start in periods:
+        # продавец -> [сумма, покупок, списаний, начислено, списано]
+        totals = {}
+        for sales, seller_name in rows:
+            if sales.day < start.isoformat():
+                continue
+            total = totals.setdefault(seller_name or str(sales.seller_id), [0.0, 0, 0, 0.0, 0.0])
+            total[0] += sales.amount
+            total[1] += sales.payments_count
+            total[2] += sales.spends_count
+            total[3] += sales.points_earned
+            total[4] += sales.points_spent
+        
+        text += f"\n{title} (с {start.strftime('%d.%m')}):\n"
+        if not totals:
+            text += "  Продаж нет\n"
+            continue
+        for seller_name, (amount, payments, spends, earned, spent) in sorted(
+            totals.items(), key=lambda item: -item[1][0]
+        ):
+            text += (
+                f"  {seller_name}: {amount:g}₽ · покупок {payments} · "
+                f"+{earned:.2f} / −{spent:.2f} баллов · списаний {spends}\n"
+            )
+        text += f"  Итого: {sum(t[0] for t in totals.values()):g}₽, покупок {sum(t[1] for t in totals.values())}\n"
+    return text
+
+async def cb_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Статистика продаж"""
+    keyboard = [[InlineKeyboardButton("◀️ Назад в меню", callback_data="back_to_menu")]]
+    await update.callback_query.edit_message_text(
+        await sales_stats_text(), reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def cb_manage_roles(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Управление ролями"""
+    keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="back_to_menu")]]
+    await update.callback_query.edit_message_text(
+        "👥 Управление ролями\n\n"
+        "Отправьте команду в формате:\n"
+        "/setrole <user_id> <role>\n\n"
+        "Роли: creator, admin, seller, client",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+
+async def cb_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Массовая рассылка"""
+    keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")]]
+    await update.callback_query.edit_message_text(
+        "📢 Массовая рассылка\n\nОтправьте сообщение для рассылки",
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
+    set_state(context, 'broadcast')
+
+async def cb_birthday_settings(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Настройка рассылки в ДР"""
+    query = update.callback_query
+    try:
+        # Получаем текущие настройки
+        birthday_msg = await BirthdayMessageModel.get_birthday_message()
+        current_text = birthday_msg.message_text if birthday_msg else "Не настроено"
+        has_photo = birthday_msg and birthday_msg.photo_file_id
+        
+        keyboard = [[InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")]]
+        await query.edit_message_text(
+            "🎂 Настройка рассылки в День Рождения\n\n"
+            f"Текущий текст:\n{current_text[:100]}...\n"
+            f"Фото: {'✅ Есть' if has_photo else '❌ Нет'}\n\n"
+            "Введите новый текст поздравления:",
+            reply_markup=InlineKeyboardMarkup(keyboard)
+        )
+        set_state(context, 'birthday_text')
+    except Exception as e:
+        logger.error(f"Ошибка настройки рассылки ДР: {e}")
+        await query.edit_message_text(
+            "❌ Ошибка настройки рассылки.\n"
+            "Попробуйте позже или обратитесь к разработчику."
+        )
+
+# ===== Шаги диалогов (текст) =====
+
+async def st_editing_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Изменение имени в профиле"""
+    text = update.message.text
+    user_id = update.effective_user.id
+    if not text.strip():
+        await update.message.reply_text("❌ Имя не может быть пустым\nПопробуйте ещё раз:")
+        return
+    
+    try:
+        await UserModel.update_profile(user_id, profile_name=text.strip())
+        
+        await update.message.reply_text(
+            f"✅ Имя успешно изменено на: {text.strip()}\n\n"
+            "Используйте /menu для возврата в меню"
+        )
+        logger.info(f"Пользователь {user_id} изменил имя на: {text.strip()}")
+    except Exception as e:
+        logger.error(f"Ошибка изменения имени для {user_id}: {e}")
+        import traceback
+        traceback.print_exc()
+        await update.message.reply_text("❌ Ошибка при изменении имени. Попробуйте позже.")
+    
+    context.user_data.clear()
+
+async def st_registration_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Регистрация - Шаг 1: Имя (ФИО или кастомное)"""
+    text = update.message.text
+    # Проверка что имя не пустое
+    if not text.strip():
+        await update.message.reply_text(
+            "❌ Имя не может быть пустым\n"
+            "Попробуйте ещё раз:"
+        )
+        return
+    
+    context.user_data['profile_name'] = text.strip()
+    set_state(context, 'registration_phone')
+    
+    # Создаём кнопку для отправки телефона
+    keyboard = [[KeyboardButton("📱 Отправить номер телефона", request_contact=True)]]
+    reply_markup = ReplyKeyboardMarkup(keyboard, one_time_keyboard=True, resize_keyboard=True)
+    
+    await update.message.reply_text(
+        f"✅ Отлично, {text}!\n\n"
+        "Шаг 2/3: Поделитесь номером телефона\n"
+        "Нажмите кнопку ниже 👇\n\n"
+        "Telegram автоматически отправит ваш номер телефона",
+        reply_markup=reply_markup
+    )
+
+async def st_registration_birth_date(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Регистрация - Шаг 3: Дата рождения"""
+    from datetime import datetime
+    text = update.message.text
+    user = update.effective_user
+    user_id = user.id
+    
+    # Пробуем разные форматы (DD.MM.YYYY или DD-MM-YYYY или DD/MM/YYYY)
+    date_formats = ['%d.%m.%Y', '%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d']
+    birth_date = None
+    
+    for fmt in date_formats:
+        try:
+            date_obj = datetime.strptime(text, fmt)
+            birth_date = date_obj.strftime('%Y-%m-%d')
+            break
+        except:
+            continue
+    
+    if not birth_date:
+        await update.message.reply_text(
+            "❌ Неверный формат даты\n"
+            "Используйте формат: ДД.ММ.ГГГГ (например: 25.12.1995)\n"
+            "Попробуйте ещё раз:"
+        )
+        return
+    
+    # Сохраняем профиль
+    profile_name = context.user_data.get('profile_name')
+    phone_number = context.user_data.get('phone_number')
+    
+    # Обновляем профиль (username берется автоматически из Telegram)
+    await UserModel.update_profile(user_id, profile_name, phone_number, birth_date)
+    
+    # Очищаем данные регистрации
+    context.user_data.clear()
+    
+    # Формируем сообщение с данными
+    profile_info = f"Имя: {profile_name}\n"
+    profile_info += f"Телефон: {phone_number}\n"
+    if user.username:
+        profile_info += f"Username: @{user.username}\n"
+    profile_info += f"Дата рождения: {text}\n"
+    profile_info += f"ID: {user_id}"
+    
+    await update.message.reply_text(
+        "✅ Регистрация завершена!\n\n"
+        "📋 Ваши данные:\n" + profile_info + "\n\n"
+        "Теперь вы можете пользоваться всеми функциями бота.\n"
+        "Используйте /menu для начала работы",
+        reply_markup=ReplyKeyboardMarkup([[KeyboardButton("/menu")]], resize_keyboard=True)
+    )
+
+async def find_clients(text: str) -> list:
+    """Поиск клиентов по ID, номеру телефона (или его последним цифрам), username или имени"""
+    text = text.strip()
+    phone = text.replace('+', '').replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
+    if phone.isdigit():
+        clients = []
+        # Только цифры - это может быть и ID, и номер телефона
+        if text.isdigit():
+            client = await UserModel.get_user(int(text))
+            if client:
+                clients.append(client)
+        for client in await UserModel.find_users_by_phone(phone):
+            if all(client.telegram_id != found.telegram_id for found in clients):
+                clients.append(client)
+        return clients
+    client = await UserModel.find_user_by_username(text)
+    clients = [client] if client else []
+    if not text.startswith('@'):
+        # Свободный текст - ищем и по имени
+        for found in await UserModel.search_users_by_name(text):
+            if all(found.telegram_id != c.telegram_id for c in clients):
+                clients.append(found)
+    return clients
+
+def client_buttons(clients: list) -> InlineKeyboardMarkup:
+    """Кнопки выбора клиента из найденных"""
+    keyboard = []
+    for client in clients:
+        label = client.profile_name or client.first_name or client.username or str(client.telegram_id)
+        if client.phone_digits:
+            label += f" · …{client.phone_digits[-4:]}"
+        keyboard.append([InlineKeyboardButton(label, callback_data=f"pick_client:{client.telegram_id}")])
+    keyboard.append([InlineKeyboardButton("❌ Отмена", callback_data="back_to_menu")])
+    return InlineKeyboardMarkup(keyboard)
+
+async def offer_clients(update: Update, clients: list) -> bool:
+    """Несколько совпадений - предложить выбор кнопками (True если предложено)"""
+    if len(clients) < 2:
+        return False
+    await update.message.reply_text(
+        "🔎 Найдено несколько клиентов, выберите нужного:",
+        reply_markup=client_buttons(clients)
+    )
+    return True
+
+async def select_payment_client(reply, context: ContextTypes.DEFAULT_TYPE, client):
+    """Клиент для добавления оплаты выбран"""
+    context.user_data['client_id'] = client.telegram_id
+    set_state(context, 'payment_amount')
+    
+    await reply(
+        f"✅ Клиент найден:\n"
+        f"Имя: {client.profile_name or client.first_name}\n"
+        f"ID: {client.telegram_id}\n\n"
+        "Шаг 2/2: Введите сумму покупки (например: 1500)"
+    )
+
+async def select_spend_client(reply, context: ContextTypes.DEFAULT_TYPE, client):
+    """Клиент для списания баллов выбран"""
+    context.user_data['spend_client_id'] = client.telegram_id
+    set_state(context, 'spend_amount')
+    
+    await reply(
+        f"✅ Клиент найден:\n"
+        f"Имя: {client.profile_name or client.first_name}\n"
+        f"Баланс: {client.loyalty_points:.2f} баллов\n\n"
+        "Введите количество баллов для списания:"
+    )
+
+async def st_payment_client(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск клиента для добавления оплаты"""
+    clients = await find_clients(update.message.text)
+    
+    if not clients:
+        await update.message.reply_text(
+            "❌ Клиент не найден\n\n"
+            "Попробуйте ещё раз или используйте /menu для отмены"
+        )
+        return
+    
+    if not await offer_clients(update, clients):
+        await select_payment_client(update.message.reply_text, context, clients[0])
+
+async def st_payment_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработка суммы после выбора клиента"""
+    user_id = update.effective_user.id
+    try:
+        amount = parse_amount(update.message.text, MAX_PAYMENT_AMOUNT)
+        if amount is None:
+            await update.message.reply_text(f"Сумма должна быть от 0.01 до {MAX_PAYMENT_AMOUNT}₽")
+            return
+        
+        client_id = context.user_data.get('client_id')
+        await staff_user(update)
+        
+        # Начисляем баллы и записываем оплату одной транзакцией (имя клиента - из того же UPDATE)
+        points = amount * POINTS_PER_RUBLE
+        result = await PaymentService.record_payment(client_id, user_id, amount, points)
+        if result is None:
+            await update.message.reply_text("Ошибка: клиент не найден")
+            context.user_data.clear()
+            return
+        new_balance, client_name = result
+        
+        await update.message.reply_text(
+            f"✅ Оплата добавлена!\n\n"
+            f"Клиент: {client_name}\n"
+            f"Сумма: {amount}₽\n"
+            f"Баллов начислено: +{points:.2f}\n"
+            f"Баланс клиента: {new_balance:.2f}"
+        )
+        
+        # Уведомление клиента
+        try:
+            await context.bot.send_message(
+                chat_id=client_id,
+                text=f"💰 Оплата {amount}₽\nНачислено: {points:.2f} баллов"
+            )
+        except:
+            pass
+        
+        context.user_data.clear()
+    except ValueError:
+        await update.message.reply_text("Пожалуйста, введите корректную сумму (число)")
+
+async def st_spend_client(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Поиск клиента для списания баллов продавцом"""
+    clients = await find_clients(update.message.text)
+    
+    if not clients:
+        await update.message.reply_text("❌ Клиент не найден\n\nПопробуйте ещё раз")
+        return
+    
+    if not await offer_clients(update, clients):
+        await select_spend_client(update.message.reply_text, context, clients[0])
+
+async def st_spend_amount(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Списание баллов продавцом"""
+    user_id = update.effective_user.id
+    try:
+        points = parse_amount(update.message.text, MAX_POINTS)
+        if points is None:
+            await update.message.reply_text(f"Количество баллов должно быть от 0.01 до {MAX_POINTS}")
+            return
+        
+        client_id = context.user_data.get('spend_client_id')
+        await staff_user(update)
+        
+        # Списываем баллы (проверка баланса и списание - один UPDATE)
+        discount = points / 5.0
+        result = await PaymentService.spend_points(
+            client_id, user_id, points,
+            description=f"Списание баллов, скидка {discount:.2f} руб."
+        )
+        
+        if result is None:
+            # Списание не прошло - только теперь читаем клиента, чтобы показать причину
+            client = await UserModel.get_user(client_id)
+            if not client:
+                await update.message.reply_text("Клиент не найден")
+                context.user_data.clear()
+                return
+            await update.message.reply_text(
+                f"❌ У клиента недостаточно баллов!\n"
+                f"Баланс: {client.loyalty_points:.2f}\n"
+                f"Запрошено: {points:.2f}"
+            )
+            context.user_data.clear()
+            return
+        remaining, client_name = result
+        
+        await update.message.reply_text(
+            f"✅ Баллы списаны!\n\n"
+            f"Клиент: {client_name}\n"
+            f"Списано: {points:.2f} баллов\n"
+            f"Скидка: {discount:.2f} руб.\n"
+            f"Остаток: {remaining:.2f}"
+        )
+        
+        # Уведомление клиента
+        try:
+            await context.bot.send_message(
+                chat_id=client_id,
+                text=f"💸 Использовано {points:.2f} баллов\nСкидка: {discount:.2f} руб."
+            )
+        except:
+            pass
+        
+        context.user_data.clear()
+    except ValueError:
+        await update.message.reply_text("Пожалуйста, введите корректное число")
+
+async def st_exchange_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обмен баллов (для клиента) - показываем информацию"""
+    user_id = update.effective_user.id
+    try:
+        points = parse_amount(update.message.text, MAX_POINTS)
+        if points is None:
+            await update.message.reply_text(f"Количество баллов должно быть от 0.01 до {MAX_POINTS}")
+            return
+        
+        user = await UserModel.get_user(user_id)
+        if not user:
+            await update.message.reply_text("Пользователь не найден")
+            context.user_data.clear()
+            return
+        
+        if user.loyalty_points < points:
+            await update.message.reply_text(
+                f"❌ Недостаточно баллов!\n"
+                f"Ваш баланс: {user.loyalty_points:.2f}\n"
+                f"Запрошено: {points:.2f}"
+            )
+            context.user_data.clear()
+            return
+        
+        # Курс обмена: 5 баллов = 1 рубль
+        discount_amount = points / 5.0
+        
+        # Показываем информацию для продавца
+        user_info = f"ID: {user_id}"
+        if user.profile_name:
+            user_info += f"\nИмя: {user.profile_name}"
+        if user.phone_number:
+            user_info += f"\nТелефон: {user.phone_number}"
+        if user.username:
+            user_info += f"\nUsername: @{user.username}"
+        
+        await update.message.reply_text(
+            f"💸 Информация для обмена баллов\n\n"
+            f"Баллов к обмену: {points:.2f}\n"
+            f"Скидка: {discount_amount:.2f} руб.\n"
+            f"Курс: 5 баллов = 1 рубль\n\n"
+            f"📋 Сообщите продавцу:\n{user_info}\n\n"
+            f"Продавец спишет баллы через свой интерфейс"
+        )
+        context.user_data.clear()
+    except ValueError:
+        await update.message.reply_text("Пожалуйста, введите корректное число")
+
+async def st_birthday_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Настройка текста для рассылки в ДР"""
+    context.user_data['birthday_text'] = update.message.text
+    set_state(context, 'birthday_photo')
+    
+    keyboard = [[InlineKeyboardButton("⏭️ Пропустить фото", callback_data="skip_birthday_photo")]]
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    
+    await update.message.reply_text(
+        "✅ Текст сохранён!\n\n"
+        "Теперь отправьте фото для поздравления\n"
+        "Или нажмите кнопку чтобы пропустить:",
+        reply_markup=reply_markup
+    )
+
+async def save_birthday_without_photo(reply, user_id: int, context: ContextTypes.DEFAULT_TYPE):
+    """Сохранить поздравление в ДР без фото (кнопка или /skip)"""
+    try:
+        birthday_text = context.user_data.get('birthday_text')
+        await BirthdayMessageModel.update_birthday_message(birthday_text, None)
+        await reply(
+            "✅ Настройки сохранены!\n\n"
+            "Рассылка в ДР будет отправляться только с текстом (без фото)\n\n"
+            "Используйте /menu для возврата"
+        )
+        logger.info(f"Админ {user_id} настроил рассылку ДР (без фото)")
+    except Exception as e:
+        logger.error(f"Ошибка сохранения рассылки ДР: {e}")
+        await reply("❌ Ошибка сохранения. Попробуйте позже.")
+    context.user_data.clear()
+
+async def st_broadcast(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Рассылка"""
+    user_id = update.effective_user.id
+    admin = await staff_user(update)
+    progress = await update.message.reply_text("📢 Рассылка запущена...")
+    broadcast_id = await start_broadcast(context.application, admin.id, update.message.text, progress.chat_id, progress.message_id)
+    logger.info(f"Админ {user_id} запустил рассылку {broadcast_id}")
+    context.user_data.clear()
+
+# ===== Шаги диалогов (фото и контакт) =====
+
+async def st_birthday_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Фото для рассылки в ДР"""
+    user_id = update.effective_user.id
+    try:
+        photo = update.message.photo[-1]
+        photo_file_id = photo.file_id
+        birthday_text = context.user_data.get('birthday_text')
+        
+        await BirthdayMessageModel.update_birthday_message(birthday_text, photo_file_id)
+        
+        await update.message.reply_text(
+            "✅ Настройки рассылки в ДР сохранены!\n\n"
+            "📝 Текст: " + (birthday_text[:50] + "..." if len(birthday_text) > 50 else birthday_text) + "\n"
+            "📷 Фото: Загружено\n\n"
+            "Поздравления будут автоматически отправляться клиентам в день их рождения в 10:00\n\n"
+            "Используйте /menu для возврата"
+        )
+        logger.info(f"Админ {user_id} настроил рассылку ДР с фото")
+    except Exception as e:
+        logger.error(f"Ошибка сохранения фото рассылки ДР: {e}")
+        import traceback
+        traceback.print_exc()
+        await update.message.reply_text("❌ Ошибка сохранения фото. Попробуйте позже.")
+    
+    context.user_data.clear()
+
+async def st_registration_phone(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Регистрация - Шаг 2: номер телефона"""
+    user = update.effective_user
+    contact = update.message.contact
+    
+    # Проверяем, что пользователь отправил свой номер
+    if contact.user_id != user.id:
+        await update.message.reply_text("❌ Пожалуйста, отправьте ВАШ номер телефона")
+        return
+    
+    phone_number = contact.phone_number
+    context.user_data['phone_number'] = phone_number
+    set_state(context, 'registration_birth_date')
+    
+    # Сохраняем также username из Telegram
+    username_info = ""
+    if user.username:
+        username_info = f"Username: @{user.username}\n"
+    
+    await update.message.reply_text(
+        f"✅ Номер телефона сохранён: {phone_number}\n"
+        f"{username_info}\n"
+        "Шаг 3/3: Введите дату рождения\n"
+        "Формат: ДД.ММ.ГГГГ (например: 25.12.1995)",
+        reply_markup=ReplyKeyboardMarkup([[KeyboardButton("/menu")]], resize_keyboard=True)
+    )
+
+# ===== Таблицы маршрутов =====
+# Ключ - callback_data (до ':' - дальше аргумент) или состояние диалога,
+# роль - минимальная для доступа
+
+CALLBACK_ROUTES = {
+    'start_registration': Route(cb_start_registration),
+    'my_profile': Route(cb_my_profile),
+    'edit_name': Route(cb_edit_name),
+    'skip_birthday_photo': Route(cb_skip_birthday_photo, 'admin'),
+    'back_to_menu': Route(cb_back_to_menu),
+    'balance': Route(cb_balance),
+    'exchange_points': Route(cb_exchange_points),
+    'spend_points_seller': Route(cb_spend_points_seller, 'seller'),
+    'add_payment': Route(cb_add_payment, 'seller'),
+    'pick_client': Route(cb_pick_client, 'seller'),
+    'purchases': Route(cb_purchases),
+    'sales': Route(cb_sales, 'seller'),
+    'manage_roles': Route(cb_manage_roles, 'admin'),
+    'broadcast': Route(cb_broadcast, 'admin'),
+    'birthday_settings': Route(cb_birthday_settings, 'admin'),
+    'stats': Route(cb_stats, 'admin'),
+}
+
+TEXT_ROUTES = {
+    'editing_name': Route(st_editing_name),
+    'registration_name': Route(st_registration_name),
+    'registration_birth_date': Route(st_registration_birth_date),
+    'payment_client': Route(st_payment_client, 'seller'),
+    'payment_amount': Route(st_payment_amount, 'seller'),
+    'spend_client': Route(st_spend_client, 'seller'),
+    'spend_amount': Route(st_spend_amount, 'seller'),
+    'exchange_points': Route(st_exchange_points),
+    'birthday_text': Route(st_birthday_text, 'admin'),
+    'broadcast': Route(st_broadcast, 'admin'),
+}
+
+PHOTO_ROUTES = {
+    'birthday_photo': Route(st_birthday_photo, 'admin'),
+}
+
+CONTACT_ROUTES = {
+    'registration_phone': Route(st_registration_phone),
+}
+
+# ===== Входные обработчики =====
+
+async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик кнопок"""
+    query = update.callback_query
+    await query.answer()
+    key = query.data.split(':', 1)[0]
+    await dispatch(CALLBACK_ROUTES, key, update, context, RoleCheck(query.from_user.id, get_role))
+
+async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик текста"""
+    await dispatch(TEXT_ROUTES, get_state(context), update, context, RoleCheck(update.effective_user.id, get_role))
+
+async def handle_photo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик фотографий"""
+    await dispatch(PHOTO_ROUTES, get_state(context), update, context, RoleCheck(update.effective_user.id, get_role))
+
+async def handle_contact(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обработчик контакта (номер телефона)"""
+    await dispatch(CONTACT_ROUTES, get_state(context), update, context, RoleCheck(update.effective_user.id, get_role))
+
+async def skip(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Пропуск фото для рассылки ДР (команда /skip - оставляем для совместимости)"""
+    if get_state(context) == 'birthday_photo' and await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        await save_birthday_without_photo(update.message.reply_text, update.effective_user.id, context)
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /stats - статистика продаж"""
+    if await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        await update.message.reply_text(await sales_stats_text())
+
+async def rebuild_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /rebuild_stats - пересчитать сводку продаж из payments"""
+    if not await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        return
+    rows = await DailySalesModel.rebuild()
+    await update.message.reply_text(f"✅ Сводка продаж пересчитана ({rows} строк)")
+    logger.info(f"Админ {update.effective_user.id} пересчитал сводку продаж: {rows} строк")
+
+async def audit_points(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /audit_points - сверка балансов с журналом баллов"""
+    if not await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        return
+    result = await PointsLedgerModel.audit()
+    mismatches = result['mismatches']
+    text = (
+        f"🧮 Сверка балансов\n\n"
+        f"Записей журнала после контрольной точки: {result['tail']}\n"
+        f"Расхождений: {len(mismatches)}"
+    )
+    for telegram_id, stored, expected in mismatches[:10]:
+        text += f"\n  ID {telegram_id}: баланс {stored / 100:.2f}, по журналу {expected / 100:.2f}"
+    await update.message.reply_text(text)
+
+async def export(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /export <users|payments|points> [csv] - выгрузка документом (по умолчанию .csv.gz)"""
+    if not await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        return
+    args = context.args or []
+    if not args or args[0] not in EXPORTS or args[1:] not in ([], ['csv']):
+        await update.message.reply_text(
+            f"Неверный формат. Используйте: /export <{'|'.join(EXPORTS)}> [csv]\n"
+            f"По умолчанию файл сжимается (.csv.gz), csv - без сжатия"
+        )
+        return
+    if export_running():
+        await update.message.reply_text("⏳ Уже идёт другая выгрузка, дождитесь её окончания")
+        return
+    kind = args[0]
+    status = await update.message.reply_text("⏳ Готовлю выгрузку...")
+    # Выгрузка идёт в фоне - обработчик не держит очередь апдейтов
+    start_export(context.bot, status.chat_id, status.message_id, kind, compress=args[1:] != ['csv'])
+    logger.info(f"Админ {update.effective_user.id} запустил выгрузку {kind}")
+
+async def points_checkpoint(context: ContextTypes.DEFAULT_TYPE):
+    """Ежедневная контрольная точка журнала баллов"""
+    checkpoint = await PointsLedgerModel.create_checkpoint()
+    if checkpoint:
+        logger.info(f"Контрольная точка журнала баллов: до записи {checkpoint.ledger_id}")
+
+async def setrole(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Команда /setrole <user_id> <role>"""
+    if not await RoleCheck(update.effective_user.id, get_role).allows('admin'):
+        return
+    parts = update.message.text.split()
+    if len(parts) == 3:
+        try:
+            target_user_id = int(parts[1])
+            role = parts[2]
+            
+            if role not in ['creator', 'admin', 'seller', 'client']:
+                await update.message.reply_text("Неверная роль. Доступные: creator, admin, seller, client")
+                return
+            
+            await UserModel.update_role(target_user_id, role)
+            await update.message.reply_text(f"✅ Роль пользователя {target_user_id} изменена на {role}")
+        except ValueError:
+            await update.message.reply_text("Неверный формат. Используйте: /setrole <user_id> <role>")
+    else:
+        await update.message.reply_text("Неверный формат. Используйте: /setrole <user_id> <role>")
+
+
+async def post_init(application: Application):
+    """Инициализация после запуска приложения"""
+    from database import init_db
+    await init_db()
+    logger.info("База данных инициализирована")
+    
+    # Сверка ролей персонала со списками из roles.py
+    changes = await UserModel.reconcile_staff(role_index.admin_usernames, role_index.seller_usernames)
+    for role, icon in (('admin', '👑'), ('seller', '🛍️')):
+        for telegram_id, username in changes[role]:
+            logger.info(f"{icon} {username} (ID: {telegram_id}) -> роль изменена на {role}")
+    for telegram_id, username in changes['registered']:
+        logger.info(f"✅ {username} (ID: {telegram_id}) -> помечен как зарегистрированный")
+    logger.info(
+        f"Сверка персонала: ролей изменено {len(changes['admin']) + len(changes['seller'])}, "
+        f"зарегистрировано {len(changes['registered'])}"
+    )
+    
+    # Индекс ролей для проверок прав без запросов к базе
+    role_index.load(await UserModel.get_staff())
+    logger.info("Индекс ролей загружен")
+    
+    # Настройка меню с быстрыми командами
+    from telegram import BotCommand
+    try:
+        await application.bot.set_my_commands([
+            BotCommand("start", "🏠 Начало работы"),
+            BotCommand("menu", "📋 Главное меню"),
+            BotCommand("balance", "💰 Мой баланс"),
+        ])
+        logger.info("Быстрые команды настроены")
+    except Exception as e:
+        logger.error(f"Ошибка настройки команд: {e}")
+    
+    # Продолжаем рассылки, прерванные перезапуском
+    resumed = await resume_broadcasts(application)
+    if resumed:
+        logger.info(f"Продолжено прерванных рассылок: {resumed}")
+
+
+async def post_stop(application: Application):
+    """Остановка: прервать рассылки и выгрузку (после сохранения состояния, до закрытия приложения)"""
+    await stop_broadcasts()
+    await stop_export()
+
+
+def main():
+    """Запуск бота"""
+    application = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .persistence(DBPersistence())
+        # Апдейты разных пользователей - параллельно, одного пользователя - по очереди
+        .concurrent_updates(PerUserUpdateProcessor())
+        .post_init(post_init)
+        .post_stop(post_stop)
+        .build()
+    )
+    
+    # Учёт активности сессий - до всех остальных обработчиков
+    session_store.attach(application)
+    application.add_handler(TypeHandler(Update, session_store.touch), group=-1)
+    
+    # Регистрация обработчиков
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CommandHandler("menu", menu))
+    application.add_handler(CommandHandler("balance", balance))
+    application.add_handler(CommandHandler("setrole", setrole))
+    application.add_handler(CommandHandler("stats", stats))
+    application.add_handler(CommandHandler("rebuild_stats", rebuild_stats))
+    application.add_handler(CommandHandler("audit_points", audit_points))
+    application.add_handler(CommandHandler("export", export))
+    application.add_handler(CommandHandler("skip", skip))
+    application.add_handler(CallbackQueryHandler(button_callback))
+    application.add_handler(MessageHandler(filters.PHOTO, handle_photo))
+    application.add_handler(MessageHandler(filters.CONTACT, handle_contact))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text))
+    
+    # Автоматическая рассылка ДР каждый день в 10:00 по местному времени
+    import datetime
+    local_tz = datetime.datetime.now().astimezone().tzinfo
+    application.job_queue.run_daily(
+        send_birthday_greetings,
+        time=datetime.time(hour=10, minute=0, tzinfo=local_tz)
+    )
+    logger.info("Автоматическая рассылка ДР настроена на 10:00 каждый день")
+    
+    # Контрольная точка журнала баллов каждую ночь
+    application.job_queue.run_daily(
+        points_checkpoint,
+        time=datetime.time(hour=4, minute=0, tzinfo=local_tz)
+    )
+    
+    # Сгорание старых баллов - днём, чтобы уведомления не приходили ночью
+    if POINTS_EXPIRY_MONTHS > 0:
+        application.job_queue.run_daily(
+            expire_points,
+            time=datetime.time(hour=12, minute=0, tzinfo=local_tz)
+        )
+        logger.info(f"Сгорание баллов старше {POINTS_EXPIRY_MONTHS} мес. настроено на 12:00 каждый день")
+    
+    # Выгрузка неактивных сессий из памяти
+    application.job_queue.run_repeating(session_store.sweep, interval=SESSION_SWEEP_INTERVAL)
+    
+    # Запуск
+    logger.info("Бот запущен")
+    application.run_polling(allowed_updates=Update.ALL_TYPES)
+
+if __name__ == '__main__':
+    main()
+
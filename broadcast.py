@@ -0,0 +1,172 @@
+"""
+Фоновая массовая рассылка с прогрессом для администратора.
+Прогресс хранится в БД (журнал доставки), поэтому после перезапуска
+рассылка продолжается с того места, где остановилась.
+
+Задачи рассылок запускаются через asyncio, а не Application.create_task:
+PTB при остановке ждёт завершения своих задач, и рассылка на десятки минут
+задерживала бы остановку бота и сохранение диалогов. Вместо этого
+рассылки отменяются в post_stop (stop_broadcasts).
+"""
+
+import asyncio
+import os
+import time
+import logging
+from telegram import Bot
+from telegram.ext import Application
+
+from models import BroadcastModel
+from sender import send_many, rate_limiter, SEND_CONCURRENCY
+
+logger = logging.getLogger(__name__)
+
+BROADCAST_BATCH_SIZE = int(os.getenv('BROADCAST_BATCH_SIZE', '100'))
+# Журнал доставки пишется пачками: волна получателей помечается 'sending' одним UPDATE,
+# результаты копятся и записываются каждые BROADCAST_FLUSH_SIZE штук или раз в секунду
+BROADCAST_WAVE_SIZE = int(os.getenv('BROADCAST_WAVE_SIZE', str(SEND_CONCURRENCY)))
+BROADCAST_FLUSH_SIZE = int(os.getenv('BROADCAST_FLUSH_SIZE', '50'))
+BROADCAST_FLUSH_INTERVAL = 1.0
+PROGRESS_INTERVAL = 3.0
+
+# Идущие рассылки (для отмены при остановке бота)
+_tasks = set()
+
+
+def _progress_text(broadcast, rate: float = 0.0) -> str:
+    header = "✅ Рассылка завершена" if broadcast.status == 'done' else "📢 Рассылка идёт..."
+    return (
+        f"{header}\n\n"
+        f"Отправлено: {broadcast.sent_count} из {broadcast.total_count}\n"
+        f"Ошибок: {broadcast.failed_count}\n"
+        f"Скорость: {rate:.1f} сообщ./с"
+    )
+
+
+async def _edit_progress(bot: Bot, broadcast, rate: float = 0.0):
+    """Обновить сообщение с прогрессом (с учётом лимита на чат)"""
+    if not broadcast.progress_chat_id or not broadcast.progress_message_id:
+        return
+    await rate_limiter.wait(broadcast.progress_chat_id)
+    try:
+        await bot.edit_message_text(
+            chat_id=broadcast.progress_chat_id,
+            message_id=broadcast.progress_message_id,
+            text=_progress_text(broadcast, rate)
+        )
+    except Exception as e:
+        logger.debug(f"Не удалось обновить прогресс рассылки: {e}")
+
+
+async def run_broadcast(bot: Bot, broadcast_id: int):
+    """
+    Рассылка (выполняется фоновой задачей, а не в обработчике).
+
+    Журнал доставки: получатели берутся пачками ('pending'), перед отправкой волна
+    помечается 'sending', результаты ('sent' / 'failed') записываются пачками.
+    При остановке бота накопленные результаты дописываются, и в 'unknown' после
+    перезапуска попадают только отправки, шедшие в тот момент. При аварийном
+    завершении процесса 'unknown' - не больше BROADCAST_WAVE_SIZE + BROADCAST_FLUSH_SIZE
+    получателей (текущая волна и незаписанные результаты); им повторно не отправляем.
+    """
+    broadcast = await BroadcastModel.get_broadcast(broadcast_id)
+    if not broadcast or broadcast.status != 'running':
+        return
+
+    abandoned = await BroadcastModel.abandon_sending(broadcast_id)
+    if abandoned:
+        logger.warning(f"Рассылка {broadcast_id}: {abandoned} получателей в неизвестном состоянии после перезапуска")
+
+    sent_ids, failed_ids = [], []
+    last_flush = time.monotonic()
+
+    # Записи журнала защищены от отмены: при остановке бота прерывается отправка,
+    # а не запись её статуса
+    async def flush():
+        nonlocal sent_ids, failed_ids, last_flush
+        sent, failed = sent_ids, failed_ids
+        sent_ids, failed_ids = [], []
+        last_flush = time.monotonic()
+        if sent or failed:
+            await asyncio.shield(BroadcastModel.record_results(broadcast_id, sent, failed))
+
+    async def on_result(chat_id, result, error):
+        (failed_ids if error else sent_ids).append(chat_id)
+        if (len(sent_ids) + len(failed_ids) >= BROADCAST_FLUSH_SIZE
+                or time.monotonic() - last_flush >= BROADCAST_FLUSH_INTERVAL):
+            await flush()
+
+    async def recipients():
+        # Сначала - не начатый остаток пачки, взятой до перезапуска
+        batch = await BroadcastModel.get_pending(broadcast_id)
+        while True:
+            if not batch:
+                batch = await BroadcastModel.claim_batch(broadcast_id, BROADCAST_BATCH_SIZE)
+                if not batch:
+                    return
+            for start in range(0, len(batch), BROADCAST_WAVE_SIZE):
+                wave = batch[start:start + BROADCAST_WAVE_SIZE]
+                await asyncio.shield(BroadcastModel.mark_sending(broadcast_id, wave))
+                for chat_id in wave:
+                    yield chat_id
+            batch = None
+
+    async def on_progress(stats):
+        await _edit_progress(bot, await BroadcastModel.get_broadcast(broadcast_id), stats.rate)
+
+    try:
+        stats = await send_many(bot.send_message, recipients(), on_result=on_result, on_progress=on_progress,
+                                progress_interval=PROGRESS_INTERVAL, text=broadcast.message_text)
+    finally:
+        await flush()
+
+    await BroadcastModel.complete_broadcast(broadcast_id)
+    broadcast = await BroadcastModel.get_broadcast(broadcast_id)
+    elapsed = stats.elapsed
+    rate = stats.rate
+    await _edit_progress(bot, broadcast, rate)
+    logger.info(
+        f"Рассылка {broadcast_id} завершена: {broadcast.sent_count}/{broadcast.total_count}, "
+        f"ошибок {broadcast.failed_count}, {elapsed:.1f} с ({rate:.1f} сообщ./с)"
+    )
+
+
+def _on_done(task: asyncio.Task):
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception():
+        logger.error(f"Ошибка рассылки: {task.exception()!r}")
+
+
+def _spawn(bot: Bot, broadcast_id: int):
+    task = asyncio.create_task(run_broadcast(bot, broadcast_id), name=f"broadcast-{broadcast_id}")
+    _tasks.add(task)
+    task.add_done_callback(_on_done)
+
+
+async def stop_broadcasts():
+    """Отменить идущие рассылки (post_stop); продолжатся при следующем запуске"""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if tasks:
+        logger.info(f"Остановлено рассылок: {len(tasks)}")
+
+
+async def start_broadcast(application: Application, sender_id: int, text: str,
+                          chat_id: int, message_id: int) -> int:
+    """Создать запись о рассылке и запустить её в фоне"""
+    broadcast = await BroadcastModel.create_broadcast(
+        sender_id, text, progress_chat_id=chat_id, progress_message_id=message_id
+    )
+    _spawn(application.bot, broadcast.id)
+    return broadcast.id
+
+
+async def resume_broadcasts(application: Application) -> int:
+    """Продолжить рассылки, прерванные перезапуском бота"""
+    unfinished = await BroadcastModel.get_unfinished_broadcasts()
+    for broadcast in unfinished:
+        _spawn(application.bot, broadcast.id)
+        logger.info(f"Продолжаю рассылку {broadcast.id} с users.id > {broadcast.last_user_id}")
+    return len(unfinished)
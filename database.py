@@ -1,10 +1,12 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base, sessionmaker
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy.orm import declarative_base
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Index
 from datetime import datetime
 import os
 from dotenv import load_dotenv
 
+import storage
+
 load_dotenv()
 
 Base = declarative_base()
@@ -16,12 +18,29 @@ class User(Base):
     id = Column(Integer, primary_key=True)
     telegram_id = Column(Integer, unique=True, nullable=False)
     username = Column(String(255), nullable=True)
+    username_lower = Column(String(255), nullable=True)  # username в нижнем регистре для поиска
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
     role = Column(String(50), default='client')  # creator, admin, seller, client
     loyalty_points = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
     is_active = Column(Boolean, default=True)
+    
+    # Поля профиля
+    profile_name = Column(String(255), nullable=True)  # Имя на английском
+    phone_number = Column(String(50), nullable=True, unique=True)  # Номер телефона
+    phone_digits = Column(String(20), nullable=True)  # Номер только цифрами (7XXXXXXXXXX)
+    phone_rev = Column(String(20), nullable=True)  # phone_digits задом наперёд - поиск по последним цифрам
+    birth_date = Column(String(10), nullable=True)  # Дата рождения (YYYY-MM-DD)
+    birth_md = Column(String(5), nullable=True)  # Месяц-день рождения (MM-DD) для поиска по индексу
+    is_registered = Column(Boolean, default=False)  # Завершена ли регистрация
+    
+    __table_args__ = (
+        Index('idx_users_username_lower', 'username_lower'),
+        Index('idx_users_birth_md', 'birth_md'),
+        Index('idx_users_phone_digits', 'phone_digits'),
+        Index('idx_users_phone_rev', 'phone_rev'),
+    )
 
 
 class Payment(Base):
@@ -36,6 +55,56 @@ class Payment(Base):
     qr_code_path = Column(String(500), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     description = Column(Text, nullable=True)
+    
+    __table_args__ = (
+        # История по клиенту / продавцу от новых к старым (keyset-пагинация)
+        Index('idx_payments_client_created', 'client_id', 'created_at'),
+        Index('idx_payments_seller_created', 'seller_id', 'created_at'),
+    )
+
+
+class PointsLedger(Base):
+    __tablename__ = 'points_ledger'
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    delta = Column(Integer, nullable=False)  # Изменение баланса в сотых долях балла
+    kind = Column(String(10), nullable=False)  # opening, earn, spend, expire
+    payment_id = Column(Integer, ForeignKey('payments.id'), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # Сгорание баллов: записи пользователя по времени (покрывающий - без чтения таблицы)
+        Index('idx_points_ledger_user_created', 'user_id', 'created_at', 'delta'),
+    )
+
+
+class LedgerCheckpoint(Base):
+    __tablename__ = 'ledger_checkpoints'
+    
+    id = Column(Integer, primary_key=True)
+    ledger_id = Column(Integer, nullable=False)  # Последняя учтённая запись points_ledger
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class CheckpointBalance(Base):
+    __tablename__ = 'checkpoint_balances'
+    
+    checkpoint_id = Column(Integer, ForeignKey('ledger_checkpoints.id'), primary_key=True)
+    user_id = Column(Integer, primary_key=True)
+    balance = Column(Integer, nullable=False)  # Баланс по журналу на момент контрольной точки, сотые
+
+
+class DailySales(Base):
+    __tablename__ = 'daily_sales'
+    
+    day = Column(String(10), primary_key=True)  # Местная дата YYYY-MM-DD
+    seller_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    amount = Column(Float, nullable=False, default=0.0)  # Сумма покупок
+    payments_count = Column(Integer, nullable=False, default=0)  # Количество покупок
+    spends_count = Column(Integer, nullable=False, default=0)  # Количество списаний
+    points_earned = Column(Float, nullable=False, default=0.0)
+    points_spent = Column(Float, nullable=False, default=0.0)
 
 
 class Broadcast(Base):
@@ -46,18 +115,67 @@ class Broadcast(Base):
     message_text = Column(Text, nullable=False)
     sent_count = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Состояние рассылки (для продолжения после перезапуска)
+    status = Column(String(20), default='running')  # running, done
+    failed_count = Column(Integer, default=0)
+    total_count = Column(Integer, default=0)
+    last_user_id = Column(Integer, default=0)  # users.id последнего взятого в работу получателя
+    progress_chat_id = Column(Integer, nullable=True)
+    progress_message_id = Column(Integer, nullable=True)
+
+
+class BroadcastDelivery(Base):
+    __tablename__ = 'broadcast_deliveries'
+    
+    broadcast_id = Column(Integer, ForeignKey('broadcasts.id'), primary_key=True)
+    telegram_id = Column(Integer, primary_key=True)
+    status = Column(String(10), nullable=False, default='pending')  # pending, sending, sent, failed, unknown
+
+
+class BirthdayMessage(Base):
+    __tablename__ = 'birthday_messages'
+    
+    id = Column(Integer, primary_key=True)
+    message_text = Column(Text, nullable=False)
+    photo_file_id = Column(String(500), nullable=True)  # Telegram file_id
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MediaFile(Base):
+    __tablename__ = 'media_files'
+    
+    path = Column(String(500), primary_key=True)  # Путь к локальному файлу
+    content_hash = Column(String(64), nullable=False)  # sha256 содержимого
+    file_id = Column(String(500), nullable=False)  # Telegram file_id загруженного файла
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SessionState(Base):
+    __tablename__ = 'session_state'
+    
+    kind = Column(String(4), primary_key=True)  # user, chat
+    owner_id = Column(Integer, primary_key=True)  # Telegram ID пользователя или чата
+    data = Column(Text, nullable=False)  # user_data / chat_data в компактном JSON
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 # Настройка базы данных
 DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite+aiosqlite:///korejapy_bot.db')
-engine = create_async_engine(DATABASE_URL, echo=False)
+if DATABASE_URL.startswith('sqlite:///'):
+    # Синхронный URL из старого .env -> асинхронный драйвер
+    DATABASE_URL = DATABASE_URL.replace('sqlite:///', 'sqlite+aiosqlite:///', 1)
+engine = storage.install(create_async_engine(DATABASE_URL, echo=False, **storage.engine_options(DATABASE_URL)))
+# expire_on_commit=False: объекты остаются читаемыми после закрытия сессии (нужно для кэша)
 async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
 
 async def init_db():
-    """Инициализация базы данных"""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    """Инициализация базы данных: применить недостающие миграции схемы"""
+    from migrations import migrate
+    return await migrate(engine)
 
 
 async def get_session() -> AsyncSession:
@@ -67,4 +185,3 @@ async def get_session() -> AsyncSession:
             yield session
         finally:
             await session.close()
-
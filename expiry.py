@@ -0,0 +1,86 @@
+"""
+Ежедневное сгорание старых баллов.
+Баллы, начисленные раньше POINTS_EXPIRY_MONTHS месяцев назад и не потраченные, списываются
+записью 'expire' в журнале; клиенты обрабатываются пачками, по транзакции на пачку,
+поэтому оплаты на кассе ждут блокировку не дольше одной пачки.
+"""
+
+import os
+import time
+import logging
+from calendar import monthrange
+from datetime import datetime
+from telegram.ext import ContextTypes
+
+from payment_service import PaymentService
+from sender import send_many
+
+logger = logging.getLogger(__name__)
+
+POINTS_EXPIRY_MONTHS = int(os.getenv('POINTS_EXPIRY_MONTHS', '12'))  # 0 - баллы не сгорают
+POINTS_EXPIRY_BATCH_SIZE = int(os.getenv('POINTS_EXPIRY_BATCH_SIZE', '500'))
+
+
+def expiry_cutoff(now: datetime, months: int = POINTS_EXPIRY_MONTHS) -> datetime:
+    """Момент, раньше которого начисленные баллы сгорают (31-е число сдвигается на конец месяца)"""
+    year, month = divmod(now.year * 12 + now.month - 1 - months, 12)
+    month += 1
+    return now.replace(year=year, month=month, day=min(now.day, monthrange(year, month)[1]))
+
+
+def expiry_text(cents: int, balance: float) -> str:
+    return (
+        f"⌛ Сгорело {cents / 100:.2f} баллов, начисленных более {POINTS_EXPIRY_MONTHS} мес. назад.\n"
+        f"💰 Ваш баланс: {balance:.2f} баллов"
+    )
+
+
+async def expire_points(context: ContextTypes.DEFAULT_TYPE):
+    """Сжечь просроченные баллы и уведомить клиентов (по одному сообщению на клиента)"""
+    if POINTS_EXPIRY_MONTHS <= 0:
+        return
+
+    bot = context.bot
+    cutoff = expiry_cutoff(datetime.utcnow())
+    last_user_id = 0
+    scanned = 0
+    expired_clients = 0
+    expired_cents = 0
+    db_time = 0.0
+    sent = 0
+    failed = 0
+
+    while True:
+        started = time.monotonic()
+        batch = await PaymentService.expire_points(cutoff, last_user_id, POINTS_EXPIRY_BATCH_SIZE)
+        db_time += time.monotonic() - started
+        if batch is None:
+            break
+        last_user_id, batch_scanned, affected = batch
+        scanned += batch_scanned
+        expired_clients += len(affected)
+        expired_cents += sum(cents for _, cents, _ in affected)
+        if not affected:
+            continue
+
+        # Уведомления - после фиксации пачки, транзакция их не ждёт
+        texts = {telegram_id: expiry_text(cents, balance) for telegram_id, cents, balance in affected}
+
+        async def send(chat_id, **kwargs):
+            return await bot.send_message(chat_id=chat_id, text=texts[chat_id])
+
+        def on_result(chat_id, result, error):
+            if error:
+                logger.error(f"Ошибка уведомления о сгорании баллов {chat_id}: {error}")
+
+        stats = await send_many(send, texts, on_result=on_result)
+        sent += stats.sent
+        failed += stats.failed
+
+    if scanned:
+        logger.info(
+            f"Сгорание баллов до {cutoff:%Y-%m-%d}: проверено {scanned} клиентов за {db_time:.2f} с "
+            f"({scanned / db_time if db_time > 0 else 0:.0f} строк/с), "
+            f"сгорело {expired_cents / 100:.2f} баллов у {expired_clients}, "
+            f"уведомлений {sent}, ошибок {failed}"
+        )
@@ -0,0 +1,138 @@
+"""
+Выгрузка таблиц в CSV для админов.
+Строки читаются из базы пачками и сразу пишутся во временные файлы
+(по умолчанию через gzip), поэтому память не зависит от размера таблицы.
+
+PTB читает отправляемый документ в память целиком, а Bot API принимает
+файлы до 50 МБ - поэтому выгрузка делится на части не больше EXPORT_PART_SIZE,
+каждая со своей строкой заголовка.
+
+Выгрузка выполняется фоновой задачей (как рассылки), не в обработчике
+команды; одновременно идёт не больше одной выгрузки.
+"""
+
+import asyncio
+import csv
+import gzip
+import io
+import os
+import tempfile
+import time
+import logging
+from datetime import date
+from telegram import Bot
+
+from models import ExportModel
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', '1000'))
+TELEGRAM_UPLOAD_LIMIT = 50 * 1024 * 1024
+# Запас под последнюю пачку и буферы сжатия
+EXPORT_PART_SIZE = min(int(os.getenv('EXPORT_PART_SIZE', str(20 * 1024 * 1024))),
+                       TELEGRAM_UPLOAD_LIMIT - 5 * 1024 * 1024)
+# UTF-8 с BOM - Excel открывает кириллицу без выбора кодировки
+EXPORT_ENCODING = 'utf-8-sig'
+
+# Идущая выгрузка (для запрета второй и отмены при остановке бота)
+_task = None
+
+
+class _Part:
+    """Одна часть выгрузки: временный файл, (gzip) и CSV-писатель поверх него"""
+
+    def __init__(self, kind: str, compress: bool, header: list):
+        fd, self.path = tempfile.mkstemp(prefix=f'export_{kind}_', suffix='.csv.gz' if compress else '.csv')
+        self.raw = os.fdopen(fd, 'wb')
+        stream = gzip.GzipFile(fileobj=self.raw, mode='wb') if compress else self.raw
+        self.text = io.TextIOWrapper(stream, encoding=EXPORT_ENCODING, newline='')
+        self.writer = csv.writer(self.text)
+        self.writer.writerow(header)
+
+    @property
+    def size(self) -> int:
+        """Байт уже записано на диск (без содержимого буферов)"""
+        return self.raw.tell()
+
+    def close(self):
+        self.text.close()  # GzipFile не закрывает переданный fileobj
+        self.raw.close()
+
+
+async def write_export(kind: str, compress: bool = True) -> tuple:
+    """
+    Записать выгрузку kind во временные файлы не больше EXPORT_PART_SIZE.
+    Возвращает ([пути частей], строк); файлы удаляет вызывающий.
+    """
+    header = ExportModel.header(kind)
+    started = time.monotonic()
+    rows = 0
+    part = _Part(kind, compress, header)
+    paths = [part.path]
+    try:
+        async for chunk in ExportModel.iter_rows(kind, EXPORT_CHUNK_SIZE):
+            if part.size >= EXPORT_PART_SIZE:
+                part.close()
+                part = _Part(kind, compress, header)
+                paths.append(part.path)
+            # Кодирование и сжатие - в потоке, чтобы не задерживать обработку апдейтов
+            await asyncio.to_thread(part.writer.writerows, chunk)
+            rows += len(chunk)
+        part.close()
+    except BaseException:
+        part.close()
+        for path in paths:
+            os.remove(path)
+        raise
+    elapsed = time.monotonic() - started
+    size = sum(os.path.getsize(path) for path in paths)
+    logger.info(
+        f"Выгрузка {kind}: {rows} строк, {len(paths)} файл(ов), {size / 1024:.0f} КБ за {elapsed:.1f} с"
+    )
+    return paths, rows
+
+
+async def run_export(bot: Bot, chat_id: int, status_message_id: int, kind: str, compress: bool):
+    """Записать выгрузку и отправить её частями в чат; статус - в сообщении status_message_id"""
+    paths = []
+    try:
+        paths, rows = await write_export(kind, compress)
+        extension = ".csv.gz" if compress else ".csv"
+        for number, path in enumerate(paths, 1):
+            part = f"_part{number}" if len(paths) > 1 else ""
+            caption = f"📤 {kind}: {rows} строк" + (f" (часть {number}/{len(paths)})" if len(paths) > 1 else "")
+            with open(path, 'rb') as file:
+                await bot.send_document(
+                    chat_id=chat_id, document=file,
+                    filename=f"{kind}_{date.today()}{part}{extension}", caption=caption
+                )
+        await bot.delete_message(chat_id=chat_id, message_id=status_message_id)
+    except Exception as e:
+        logger.error(f"Ошибка выгрузки {kind}: {e}")
+        await bot.edit_message_text(
+            chat_id=chat_id, message_id=status_message_id, text=f"❌ Не удалось выгрузить {kind}: {e}"
+        )
+    finally:
+        for path in paths:
+            os.remove(path)
+
+
+def export_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def start_export(bot: Bot, chat_id: int, status_message_id: int, kind: str, compress: bool) -> bool:
+    """Запустить выгрузку в фоне; False - уже идёт другая"""
+    global _task
+    if export_running():
+        return False
+    _task = asyncio.create_task(run_export(bot, chat_id, status_message_id, kind, compress),
+                                name=f"export-{kind}")
+    return True
+
+
+async def stop_export():
+    """Отменить идущую выгрузку (post_stop); временные файлы удаляются"""
+    if export_running():
+        _task.cancel()
+        await asyncio.gather(_task, return_exceptions=True)
@@ -0,0 +1,70 @@
+"""
+Кэш Telegram file_id для локальных файлов бота (логотип и т.п.).
+Файл загружается в Telegram один раз, дальше отправляется по file_id.
+Если файл на диске изменился (другой sha256), file_id сбрасывается.
+"""
+
+import os
+import hashlib
+import logging
+from telegram.error import BadRequest
+
+from models import MediaFileModel
+
+logger = logging.getLogger(__name__)
+
+# path -> (mtime_ns, size, content_hash, file_id)
+_entries = {}
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def _cached_file_id(path: str):
+    """Вернуть (content_hash, file_id) для файла; file_id = None если нужна загрузка"""
+    stat = os.stat(path)
+    entry = _entries.get(path)
+    if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+        return entry[2], entry[3]
+
+    # Файл новый для процесса или изменился на диске - сверяем хэш с БД
+    content_hash = _file_hash(path)
+    media = await MediaFileModel.get_media_file(path)
+    file_id = media.file_id if media and media.content_hash == content_hash else None
+    _entries[path] = (stat.st_mtime_ns, stat.st_size, content_hash, file_id)
+    return content_hash, file_id
+
+
+async def _remember(path: str, content_hash: str, file_id: str):
+    stat = os.stat(path)
+    _entries[path] = (stat.st_mtime_ns, stat.st_size, content_hash, file_id)
+    await MediaFileModel.save_media_file(path, content_hash, file_id)
+
+
+async def send_cached_photo(send, path: str, **kwargs):
+    """
+    Отправить фото из локального файла через send (например, message.reply_photo).
+    Используется сохранённый file_id, при первой отправке файл загружается.
+    """
+    content_hash, file_id = await _cached_file_id(path)
+
+    if file_id:
+        try:
+            return await send(photo=file_id, **kwargs)
+        except BadRequest as e:
+            # file_id больше не действителен - загружаем заново
+            logger.warning(f"file_id для {path} недействителен: {e}")
+            _entries.pop(path, None)
+            await MediaFileModel.delete_media_file(path)
+
+    with open(path, 'rb') as f:
+        message = await send(photo=f, **kwargs)
+    if message and message.photo:
+        await _remember(path, content_hash, message.photo[-1].file_id)
+        logger.info(f"Файл {path} загружен в Telegram, file_id сохранён")
+    return message
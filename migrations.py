@@ -0,0 +1,387 @@
+"""
+Версионные миграции схемы базы данных.
+Номер версии хранится в таблице schema_version; при старте бота выполняются
+только недостающие миграции, все - в одной транзакции. Если схема актуальна,
+проверка сводится к одному чтению по первичному ключу.
+
+Миграции идут строго по порядку и не меняются после выпуска - новые
+изменения схемы добавляются в конец списка MIGRATIONS. DDL в миграциях
+записан явно, а не берётся из моделей database.py: новая и обновляемая
+базы проходят одинаковый путь независимо от текущего вида моделей.
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+logger = logging.getLogger(__name__)
+
+
+# --- Вспомогательные функции (conn - синхронное соединение SQLAlchemy) ---
+
+def _columns(conn, table: str) -> set:
+    return {row[1] for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _add_column(conn, table: str, column: str, ddl: str):
+    """ALTER TABLE ADD COLUMN, если колонки ещё нет (старые базы в разном состоянии)"""
+    if column not in _columns(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}")
+
+
+# --- Миграции ---
+
+def m001_base_tables(conn):
+    # Схема первой версии бота (database_sync.py)
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS users ("
+        "id INTEGER NOT NULL, "
+        "telegram_id INTEGER NOT NULL, "
+        "username VARCHAR(255), "
+        "first_name VARCHAR(255), "
+        "last_name VARCHAR(255), "
+        "role VARCHAR(50), "
+        "loyalty_points FLOAT, "
+        "created_at DATETIME, "
+        "is_active BOOLEAN, "
+        "profile_name VARCHAR(255), "
+        "phone_number VARCHAR(50), "
+        "birth_date VARCHAR(10), "
+        "is_registered BOOLEAN, "
+        "PRIMARY KEY (id), "
+        "UNIQUE (telegram_id), "
+        "UNIQUE (phone_number))"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS payments ("
+        "id INTEGER NOT NULL, "
+        "client_id INTEGER NOT NULL, "
+        "seller_id INTEGER NOT NULL, "
+        "amount FLOAT NOT NULL, "
+        "points_earned FLOAT, "
+        "points_spent FLOAT, "
+        "qr_code_path VARCHAR(500), "
+        "created_at DATETIME, "
+        "description TEXT, "
+        "PRIMARY KEY (id), "
+        "FOREIGN KEY(client_id) REFERENCES users (id), "
+        "FOREIGN KEY(seller_id) REFERENCES users (id))"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS broadcasts ("
+        "id INTEGER NOT NULL, "
+        "sender_id INTEGER NOT NULL, "
+        "message_text TEXT NOT NULL, "
+        "sent_count INTEGER, "
+        "created_at DATETIME, "
+        "PRIMARY KEY (id), "
+        "FOREIGN KEY(sender_id) REFERENCES users (id))"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS birthday_messages ("
+        "id INTEGER NOT NULL, "
+        "message_text TEXT NOT NULL, "
+        "photo_file_id VARCHAR(500), "
+        "is_active BOOLEAN, "
+        "created_at DATETIME, "
+        "updated_at DATETIME, "
+        "PRIMARY KEY (id))"
+    )
+
+
+def m002_user_profile(conn):
+    _add_column(conn, 'users', 'profile_name', 'TEXT')
+    _add_column(conn, 'users', 'phone_number', 'TEXT')
+    _add_column(conn, 'users', 'birth_date', 'TEXT')
+    _add_column(conn, 'users', 'is_registered', 'BOOLEAN DEFAULT 0')
+
+
+def m003_birthday_photo_file_id(conn):
+    columns = _columns(conn, 'birthday_messages')
+    if 'photo_file_id' not in columns:
+        conn.exec_driver_sql("ALTER TABLE birthday_messages ADD COLUMN photo_file_id TEXT")
+        if 'photo_path' in columns:
+            # Старая колонка photo_path остаётся для совместимости
+            conn.exec_driver_sql(
+                "UPDATE birthday_messages SET photo_file_id = photo_path WHERE photo_path IS NOT NULL"
+            )
+    _add_column(conn, 'birthday_messages', 'is_active', 'BOOLEAN DEFAULT 1')
+    if 'updated_at' not in columns:
+        conn.exec_driver_sql("ALTER TABLE birthday_messages ADD COLUMN updated_at TIMESTAMP")
+        conn.exec_driver_sql("UPDATE birthday_messages SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL")
+
+
+def m004_search_columns(conn):
+    # username в нижнем регистре и месяц-день рождения - поиск по индексам
+    _add_column(conn, 'users', 'username_lower', 'VARCHAR(255)')
+    _add_column(conn, 'users', 'birth_md', 'VARCHAR(5)')
+    conn.exec_driver_sql(
+        "UPDATE users SET username_lower = lower(username) "
+        "WHERE username IS NOT NULL AND (username_lower IS NULL OR username_lower != lower(username))"
+    )
+    conn.exec_driver_sql(
+        "UPDATE users SET birth_md = substr(birth_date, 6, 5) "
+        "WHERE birth_date IS NOT NULL AND (birth_md IS NULL OR birth_md != substr(birth_date, 6, 5))"
+    )
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_users_username_lower ON users(username_lower)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_users_birth_md ON users(birth_md)")
+
+
+def m005_indexes(conn):
+    # Индексы из optimize_db.py, которые используются запросами бота
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_payments_client ON payments(client_id)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_payments_seller ON payments(seller_id)")
+    # Дубли: telegram_id и phone_number уже проиндексированы ограничением UNIQUE,
+    # поиск по username и дате рождения идёт через username_lower и birth_md
+    for name in ('idx_users_telegram_id', 'idx_users_phone', 'idx_users_username', 'idx_users_birth_date'):
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+def m006_resumable_broadcasts(conn):
+    if 'status' not in _columns(conn, 'broadcasts'):
+        # Старые рассылки считаем завершёнными
+        conn.exec_driver_sql("ALTER TABLE broadcasts ADD COLUMN status VARCHAR(20) DEFAULT 'done'")
+    _add_column(conn, 'broadcasts', 'failed_count', 'INTEGER DEFAULT 0')
+    _add_column(conn, 'broadcasts', 'total_count', 'INTEGER DEFAULT 0')
+    _add_column(conn, 'broadcasts', 'last_user_id', 'INTEGER DEFAULT 0')
+    _add_column(conn, 'broadcasts', 'progress_chat_id', 'INTEGER')
+    _add_column(conn, 'broadcasts', 'progress_message_id', 'INTEGER')
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS broadcast_deliveries ("
+        "broadcast_id INTEGER NOT NULL, "
+        "telegram_id INTEGER NOT NULL, "
+        "status VARCHAR(10) NOT NULL, "
+        "PRIMARY KEY (broadcast_id, telegram_id), "
+        "FOREIGN KEY(broadcast_id) REFERENCES broadcasts (id))"
+    )
+
+
+def m007_media_files(conn):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS media_files ("
+        "path VARCHAR(500) NOT NULL, "
+        "content_hash VARCHAR(64) NOT NULL, "
+        "file_id VARCHAR(500) NOT NULL, "
+        "updated_at DATETIME, "
+        "PRIMARY KEY (path))"
+    )
+
+
+def m008_session_state(conn):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS session_state ("
+        "kind VARCHAR(4) NOT NULL, "
+        "owner_id INTEGER NOT NULL, "
+        "data TEXT NOT NULL, "
+        "updated_at DATETIME, "
+        "PRIMARY KEY (kind, owner_id))"
+    )
+
+
+def _normalize_phone_v9(phone: str):
+    # Копия models.normalize_phone на момент миграции 9 (не импортируется - миграция не должна меняться)
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if len(digits) == 11 and digits[0] == '8':
+        digits = '7' + digits[1:]
+    return digits or None
+
+
+def m009_phone_digits(conn):
+    _add_column(conn, 'users', 'phone_digits', 'VARCHAR(20)')
+    _add_column(conn, 'users', 'phone_rev', 'VARCHAR(20)')
+    rows = conn.exec_driver_sql("SELECT id, phone_number FROM users WHERE phone_number IS NOT NULL").fetchall()
+    params = []
+    for user_id, phone_number in rows:
+        digits = _normalize_phone_v9(phone_number)
+        params.append({'id': user_id, 'digits': digits, 'rev': digits[::-1] if digits else None})
+    if params:
+        conn.execute(text("UPDATE users SET phone_digits = :digits, phone_rev = :rev WHERE id = :id"), params)
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_users_phone_digits ON users(phone_digits)")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS idx_users_phone_rev ON users(phone_rev)")
+
+
+def m010_name_search(conn):
+    # Полнотекстовый поиск по имени (триграммы - поиск по подстроке, без учёта регистра)
+    conn.exec_driver_sql(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+        "profile_name, first_name, last_name, "
+        "content='users', content_rowid='id', tokenize='trigram')"
+    )
+    # Синхронизация триггерами; обновление баллов и прочих полей индекс не трогает
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+        "INSERT INTO users_fts(rowid, profile_name, first_name, last_name) "
+        "VALUES (new.id, new.profile_name, new.first_name, new.last_name); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, profile_name, first_name, last_name) "
+        "VALUES ('delete', old.id, old.profile_name, old.first_name, old.last_name); END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS users_fts_update "
+        "AFTER UPDATE OF profile_name, first_name, last_name ON users BEGIN "
+        "INSERT INTO users_fts(users_fts, rowid, profile_name, first_name, last_name) "
+        "VALUES ('delete', old.id, old.profile_name, old.first_name, old.last_name); "
+        "INSERT INTO users_fts(rowid, profile_name, first_name, last_name) "
+        "VALUES (new.id, new.profile_name, new.first_name, new.last_name); END"
+    )
+    conn.exec_driver_sql("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+
+
+def m011_payment_history_indexes(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS idx_payments_client_created ON payments(client_id, created_at)"
+    )
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS idx_payments_seller_created ON payments(seller_id, created_at)"
+    )
+    # Одиночные индексы - префиксы составных, больше не нужны
+    conn.exec_driver_sql("DROP INDEX IF EXISTS idx_payments_client")
+    conn.exec_driver_sql("DROP INDEX IF EXISTS idx_payments_seller")
+
+
+def m012_payment_seller_ids(conn):
+    # Первая версия бота записывала в payments.seller_id Telegram ID продавца, а не users.id
+    conn.exec_driver_sql(
+        "UPDATE payments SET seller_id = (SELECT id FROM users WHERE telegram_id = payments.seller_id) "
+        "WHERE seller_id NOT IN (SELECT id FROM users) AND seller_id IN (SELECT telegram_id FROM users)"
+    )
+
+
+def m013_daily_sales(conn):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS daily_sales ("
+        "day VARCHAR(10) NOT NULL, "
+        "seller_id INTEGER NOT NULL, "
+        "amount FLOAT NOT NULL, "
+        "payments_count INTEGER NOT NULL, "
+        "spends_count INTEGER NOT NULL, "
+        "points_earned FLOAT NOT NULL, "
+        "points_spent FLOAT NOT NULL, "
+        "PRIMARY KEY (day, seller_id), "
+        "FOREIGN KEY(seller_id) REFERENCES users (id))"
+    )
+    # Копия models.REBUILD_DAILY_SALES на момент миграции
+    conn.exec_driver_sql(
+        "INSERT INTO daily_sales (day, seller_id, amount, payments_count, spends_count, points_earned, points_spent) "
+        "SELECT date(created_at, 'localtime'), seller_id, "
+        "coalesce(sum(amount), 0), sum(points_spent = 0), sum(points_spent > 0), "
+        "coalesce(sum(points_earned), 0), coalesce(sum(points_spent), 0) "
+        "FROM payments GROUP BY 1, 2"
+    )
+
+
+def m014_points_ledger(conn):
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS points_ledger ("
+        "id INTEGER NOT NULL, "
+        "user_id INTEGER NOT NULL, "
+        "delta INTEGER NOT NULL, "
+        "kind VARCHAR(10) NOT NULL, "
+        "payment_id INTEGER, "
+        "created_at DATETIME, "
+        "PRIMARY KEY (id), "
+        "FOREIGN KEY(user_id) REFERENCES users (id), "
+        "FOREIGN KEY(payment_id) REFERENCES payments (id))"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS ledger_checkpoints ("
+        "id INTEGER NOT NULL, "
+        "ledger_id INTEGER NOT NULL, "
+        "created_at DATETIME, "
+        "PRIMARY KEY (id))"
+    )
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS checkpoint_balances ("
+        "checkpoint_id INTEGER NOT NULL, "
+        "user_id INTEGER NOT NULL, "
+        "balance INTEGER NOT NULL, "
+        "PRIMARY KEY (checkpoint_id, user_id), "
+        "FOREIGN KEY(checkpoint_id) REFERENCES ledger_checkpoints (id))"
+    )
+    # Текущие балансы - начальные записи журнала; баланс выравнивается до сотых
+    conn.exec_driver_sql(
+        "INSERT INTO points_ledger (user_id, delta, kind, created_at) "
+        "SELECT id, CAST(round(loyalty_points * 100) AS INTEGER), 'opening', CURRENT_TIMESTAMP "
+        "FROM users WHERE round(coalesce(loyalty_points, 0) * 100) != 0"
+    )
+    conn.exec_driver_sql("UPDATE users SET loyalty_points = round(coalesce(loyalty_points, 0) * 100) / 100.0")
+
+
+def m015_points_expiry_index(conn):
+    conn.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS idx_points_ledger_user_created ON points_ledger(user_id, created_at, delta)"
+    )
+
+
+def m016_active_users(conn):
+    # Получатели рассылок отбираются по is_active - пустые значения считаем активными
+    conn.exec_driver_sql("UPDATE users SET is_active = 1 WHERE is_active IS NULL")
+
+
+MIGRATIONS = [
+    (1, m001_base_tables),
+    (2, m002_user_profile),
+    (3, m003_birthday_photo_file_id),
+    (4, m004_search_columns),
+    (5, m005_indexes),
+    (6, m006_resumable_broadcasts),
+    (7, m007_media_files),
+    (8, m008_session_state),
+    (9, m009_phone_digits),
+    (10, m010_name_search),
+    (11, m011_payment_history_indexes),
+    (12, m012_payment_seller_ids),
+    (13, m013_daily_sales),
+    (14, m014_points_ledger),
+    (15, m015_points_expiry_index),
+    (16, m016_active_users),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# --- Запуск ---
+
+def _current_version(conn) -> int:
+    try:
+        return conn.exec_driver_sql("SELECT max(version) FROM schema_version").scalar() or 0
+    except OperationalError:
+        return 0  # Таблицы schema_version ещё нет
+
+
+def _migrate(conn) -> list:
+    if _current_version(conn) >= LATEST_VERSION:
+        return []
+
+    # Драйвер sqlite3 не открывает транзакцию перед DDL - открываем явно,
+    # IMMEDIATE - сразу берём блокировку записи (второй процесс подождёт)
+    conn.exec_driver_sql("BEGIN IMMEDIATE")
+    conn.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_version ("
+        "version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)"
+    )
+    current = _current_version(conn)  # Мог измениться, пока ждали блокировку
+    applied = []
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        migration(conn)
+        conn.execute(
+            text("INSERT INTO schema_version (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+            {'version': version, 'name': migration.__name__, 'applied_at': datetime.utcnow()}
+        )
+        applied.append(migration.__name__)
+    return applied
+
+
+async def migrate(engine) -> list:
+    """Применить недостающие миграции одной транзакцией; вернуть их имена"""
+    async with engine.begin() as conn:
+        applied = await conn.run_sync(_migrate)
+    for name in applied:
+        logger.info(f"Применена миграция {name}")
+    return applied
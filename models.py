@@ -1,12 +1,61 @@
-from database import async_session, User, Payment, Broadcast
-from sqlalchemy import select, update
-from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from database import async_session, User, Payment, DailySales, PointsLedger, LedgerCheckpoint, CheckpointBalance, Broadcast, BroadcastDelivery, BirthdayMessage, MediaFile, SessionState
+from sqlalchemy import select, update, insert, delete, func, or_, text, table, column, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import aliased
+from user_cache import user_cache
+from roles import role_index, STAFF_ROLES
+from datetime import datetime, date, timedelta
+from calendar import isleap
+from typing import Optional, List
+
+
+def birthday_keys(day: date) -> List[str]:
+    """
+    Ключи MM-DD, чей день рождения отмечается в указанный день.
+    Родившиеся 29 февраля в невисокосный год поздравляются 28 февраля.
+    """
+    keys = [day.strftime('%m-%d')]
+    if day.month == 2 and day.day == 28 and not isleap(day.year):
+        keys.append('02-29')
+    return keys
+
+
+def to_cents(points: float) -> int:
+    """Баллы -> целые сотые доли (единица учёта в points_ledger)"""
+    return int(round(points * 100))
+
+
+# Минимум цифр для поиска клиента по концу номера телефона
+PHONE_SUFFIX_MIN = 4
+
+
+def normalize_phone(phone: str) -> Optional[str]:
+    """Номер телефона только цифрами; российский 8XXXXXXXXXX приводится к 7XXXXXXXXXX"""
+    digits = ''.join(ch for ch in phone if ch.isdigit())
+    if len(digits) == 11 and digits[0] == '8':
+        digits = '7' + digits[1:]
+    return digits or None
+
+
+# Минимальная длина запроса для поиска по имени (триграммный индекс)
+NAME_SEARCH_MIN = 3
+
+users_fts = table('users_fts', column('rowid'), column('rank'))
+
+
+def recipients_query(after_id: int, limit: int, *criteria):
+    """Следующая пачка (id, telegram_id) активных пользователей после users.id = after_id"""
+    return (
+        select(User.id, User.telegram_id)
+        .where(User.is_active == True, User.id > after_id, *criteria)
+        .order_by(User.id)
+        .limit(limit)
+    )
 
 
 class UserModel:
     @staticmethod
-    async def get_or_create_user(telegram_id: int, username: str = None, 
+    async def get_or_create_user(telegram_id: int, username: str = None,
                                  first_name: str = None, last_name: str = None) -> User:
         """Получить или создать пользователя"""
         async with async_session() as session:
@@ -14,11 +63,12 @@ class UserModel:
                 select(User).where(User.telegram_id == telegram_id)
             )
             user = result.scalar_one_or_none()
-            
+
             if not user:
                 user = User(
                     telegram_id=telegram_id,
                     username=username,
+                    username_lower=username.lower() if username else None,
                     first_name=first_name,
                     last_name=last_name,
                     role='client'
@@ -29,68 +79,261 @@ class UserModel:
             else:
                 # Обновляем информацию о пользователе
                 user.username = username
+                user.username_lower = username.lower() if username else None
                 user.first_name = first_name
                 user.last_name = last_name
                 await session.commit()
-            
+
+            user_cache.put(telegram_id, user)
             return user
-    
+
     @staticmethod
     async def get_user(telegram_id: int) -> Optional[User]:
-        """Получить пользователя по telegram_id"""
+        """Получить пользователя по telegram_id (через кэш)"""
+        user = user_cache.get(telegram_id)
+        if user is not None:
+            return user
         async with async_session() as session:
             result = await session.execute(
                 select(User).where(User.telegram_id == telegram_id)
             )
-            return result.scalar_one_or_none()
-    
+            user = result.scalar_one_or_none()
+            user_cache.put(telegram_id, user)
+            return user
+
     @staticmethod
     async def update_role(telegram_id: int, role: str) -> bool:
         """Обновить роль пользователя"""
         async with async_session() as session:
-            await session.execute(
+            result = await session.execute(
                 update(User)
                 .where(User.telegram_id == telegram_id)
                 .values(role=role)
             )
             await session.commit()
-            return True
-    
+        user_cache.invalidate(telegram_id)
+        if result.rowcount > 0:
+            role_index.set_role(telegram_id, role)
+        return result.rowcount > 0
+
     @staticmethod
-    async def add_points(telegram_id: int, points: float) -> bool:
-        """Добавить баллы пользователю"""
+    async def get_staff() -> List[tuple]:
+        """Пары (telegram_id, role) всех сотрудников - для индекса ролей"""
         async with async_session() as session:
-            user = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
+            result = await session.execute(
+                select(User.telegram_id, User.role).where(User.role.in_(STAFF_ROLES))
             )
-            user = user.scalar_one_or_none()
-            if user:
-                user.loyalty_points += points
-                await session.commit()
-                return True
-            return False
-    
+            return [tuple(row) for row in result]
+
     @staticmethod
-    async def spend_points(telegram_id: int, points: float) -> bool:
-        """Списать баллы у пользователя"""
+    async def iter_recipients(*criteria, batch_size: int = 500, after_id: int = 0):
+        """
+        Асинхронный итератор telegram_id активных пользователей пачками по batch_size.
+        criteria - дополнительные условия отбора. Keyset по users.id, каждая пачка -
+        отдельный короткий запрос; зарегистрировавшиеся во время обхода попадают в конец.
+        """
+        while True:
+            async with async_session() as session:
+                rows = (await session.execute(recipients_query(after_id, batch_size, *criteria))).all()
+            if not rows:
+                return
+            after_id = rows[-1][0]
+            yield [telegram_id for _, telegram_id in rows]
+
+    @staticmethod
+    async def update_profile(telegram_id: int, profile_name: str = None,
+                             phone_number: str = None, birth_date: str = None) -> bool:
+        """Обновить профиль пользователя"""
+        values = {}
+        if profile_name:
+            values['profile_name'] = profile_name
+        if phone_number:
+            values['phone_number'] = phone_number
+            values['phone_digits'] = normalize_phone(phone_number)
+            values['phone_rev'] = values['phone_digits'][::-1] if values['phone_digits'] else None
+        if birth_date:
+            values['birth_date'] = birth_date
+            values['birth_md'] = birth_date[5:10]
+        if profile_name and phone_number and birth_date:
+            values['is_registered'] = True
+        if not values:
+            return await UserModel.get_user(telegram_id) is not None
+
         async with async_session() as session:
-            user = await session.execute(
-                select(User).where(User.telegram_id == telegram_id)
+            result = await session.execute(
+                update(User)
+                .where(User.telegram_id == telegram_id)
+                .values(**values)
             )
-            user = user.scalar_one_or_none()
-            if user and user.loyalty_points >= points:
-                user.loyalty_points -= points
-                await session.commit()
-                return True
-            return False
-    
+            await session.commit()
+        user_cache.invalidate(telegram_id)
+        return result.rowcount > 0
+
+    @staticmethod
+    async def set_registered(telegram_id: int) -> bool:
+        """Пометить пользователя как зарегистрированного"""
+        async with async_session() as session:
+            result = await session.execute(
+                update(User)
+                .where(User.telegram_id == telegram_id)
+                .values(is_registered=True)
+            )
+            await session.commit()
+        user_cache.invalidate(telegram_id)
+        return result.rowcount > 0
+
     @staticmethod
-    async def get_all_users() -> list[User]:
-        """Получить всех пользователей"""
+    async def reconcile_staff(admin_usernames, seller_usernames) -> dict:
+        """
+        Привести роли персонала к спискам username одной транзакцией:
+        по одному UPDATE на роль и на отметку регистрации (поиск по индексу username_lower).
+        Возвращает {'admin': [...], 'seller': [...], 'registered': [...]} - (telegram_id, username) изменённых.
+        """
+        admin_usernames = sorted(admin_usernames)
+        seller_usernames = sorted(seller_usernames)
+        changes = {}
         async with async_session() as session:
-            result = await session.execute(select(User))
+            for role, usernames, keep in (
+                ('admin', admin_usernames, ['admin', 'creator']),
+                ('seller', seller_usernames, ['seller', 'admin', 'creator']),
+            ):
+                result = await session.execute(
+                    update(User)
+                    .where(
+                        User.username_lower.in_(usernames),
+                        or_(User.role.is_(None), User.role.notin_(keep))
+                    )
+                    .values(role=role)
+                    .returning(User.telegram_id, User.username)
+                )
+                changes[role] = [tuple(row) for row in result]
+
+            result = await session.execute(
+                update(User)
+                .where(
+                    User.username_lower.in_(admin_usernames + seller_usernames),
+                    or_(User.is_registered.is_(None), User.is_registered == False)
+                )
+                .values(is_registered=True)
+                .returning(User.telegram_id, User.username)
+            )
+            changes['registered'] = [tuple(row) for row in result]
+            await session.commit()
+
+        for role in ('admin', 'seller'):
+            for telegram_id, _ in changes[role]:
+                role_index.set_role(telegram_id, role)
+        for rows in changes.values():
+            for telegram_id, _ in rows:
+                user_cache.invalidate(telegram_id)
+        return changes
+
+    @staticmethod
+    async def find_users_by_phone(phone: str, limit: int = 5) -> List[User]:
+        """
+        Найти пользователей по номеру телефона или его последним цифрам (от PHONE_SUFFIX_MIN).
+        Один запрос по индексу phone_rev: конец номера - это начало перевёрнутой строки.
+        """
+        digits = normalize_phone(phone)
+        if not digits or len(digits) < PHONE_SUFFIX_MIN:
+            return []
+        prefix = digits[::-1]
+        async with async_session() as session:
+            result = await session.execute(
+                select(User)
+                # Диапазон вместо LIKE 'prefix%' - так индекс используется всегда (':' следует за '9')
+                .where(User.phone_rev >= prefix, User.phone_rev < prefix + ':')
+                .order_by(User.phone_rev)
+                .limit(limit)
+            )
+            return list(result.scalars())
+
+    @staticmethod
+    async def search_users_by_name(query: str, limit: int = 5) -> List[User]:
+        """
+        Поиск по profile_name / first_name / last_name (FTS5, триграммы).
+        Каждое слово запроса - подстрока имени; результаты по релевантности (bm25).
+        """
+        words = [w for w in query.split() if len(w) >= NAME_SEARCH_MIN]
+        if not words:
+            return []
+        match = ' '.join('"' + w.replace('"', '""') + '"' for w in words)
+        async with async_session() as session:
+            result = await session.execute(
+                select(User)
+                .join(users_fts, users_fts.c.rowid == User.id)
+                .where(text("users_fts MATCH :match").bindparams(match=match))
+                .order_by(users_fts.c.rank)
+                .limit(limit)
+            )
+            return list(result.scalars())
+
+    @staticmethod
+    async def find_user_by_username(username: str) -> Optional[User]:
+        """Найти пользователя по username (без учёта регистра, по индексу)"""
+        # Убираем @ если есть
+        username = username.strip().lstrip('@').lower()
+        if not username:
+            return None
+        async with async_session() as session:
+            result = await session.execute(
+                select(User).where(User.username_lower == username)
+            )
+            return result.scalars().first()
+
+    @staticmethod
+    async def get_users_with_birthday_today(today: date = None) -> List[User]:
+        """Получить пользователей с днем рождения сегодня"""
+        today = today or date.today()
+        async with async_session() as session:
+            result = await session.execute(
+                select(User).where(
+                    User.birth_md.in_(birthday_keys(today)),
+                    User.is_registered == True
+                )
+            )
             return list(result.scalars().all())
 
+    @staticmethod
+    async def iter_birthday_recipients(today: date = None, batch_size: int = 500):
+        """
+        Асинхронный итератор telegram_id именинников пачками по batch_size
+        (keyset по users.id, без загрузки полных объектов)
+        """
+        keys = birthday_keys(today or date.today())
+        async for batch in UserModel.iter_recipients(User.birth_md.in_(keys), User.is_registered == True,
+                                                     batch_size=batch_size):
+            yield batch
+
+    @staticmethod
+    async def get_users_with_upcoming_birthdays(days: int = 7, start: date = None) -> List[User]:
+        """Получить пользователей с днем рождения в ближайшие days дней (включая start)"""
+        start = start or date.today()
+        end = start + timedelta(days=max(days, 1) - 1)
+        start_md = start.strftime('%m-%d')
+        end_md = end.strftime('%m-%d')
+        # 29 февраля в невисокосный год отмечается 28-го
+        if end_md == '02-28' and not isleap(end.year):
+            end_md = '02-29'
+
+        if days >= 366:
+            md_filter = User.birth_md.isnot(None)
+        elif start_md <= end_md:
+            md_filter = User.birth_md.between(start_md, end_md)
+        else:
+            # Диапазон переходит через Новый год
+            md_filter = or_(User.birth_md >= start_md, User.birth_md <= end_md)
+
+        async with async_session() as session:
+            result = await session.execute(
+                select(User)
+                .where(md_filter, User.is_registered == True)
+                .order_by(User.birth_md)
+            )
+            users = result.scalars().all()
+        # Сортируем по ближайшей дате с учётом перехода через год
+        return sorted(users, key=lambda u: (u.birth_md < start_md, u.birth_md))
+
 
 class PaymentModel:
     @staticmethod
@@ -114,20 +357,219 @@ class PaymentModel:
             return payment
 
 
+    @staticmethod
+    async def get_history(user_id: int, as_seller: bool = False, before_id: int = None,
+                          limit: int = 10) -> list:
+        """
+        Страница истории покупок клиента (или продаж продавца) от новых к старым.
+        user_id - users.id; before_id - id последней оплаты предыдущей страницы.
+        Keyset-пагинация по индексу (client_id|seller_id, created_at): любая страница
+        стоит как первая. Возвращает строки (Payment, имя клиента).
+        """
+        owner = Payment.seller_id if as_seller else Payment.client_id
+        async with async_session() as session:
+            query = (
+                select(Payment, func.coalesce(User.profile_name, User.first_name, User.username))
+                .join(User, User.id == Payment.client_id)
+                .where(owner == user_id)
+            )
+            if before_id:
+                cursor = await session.get(Payment, before_id)
+                if cursor:
+                    query = query.where(
+                        tuple_(Payment.created_at, Payment.id) < tuple_(cursor.created_at, cursor.id)
+                    )
+            result = await session.execute(
+                query.order_by(Payment.created_at.desc(), Payment.id.desc()).limit(limit)
+            )
+            return result.all()
+
+
+# Пересчёт сводки продаж из payments одним проходом (день - местная дата)
+REBUILD_DAILY_SALES = (
+    "INSERT INTO daily_sales (day, seller_id, amount, payments_count, spends_count, points_earned, points_spent) "
+    "SELECT date(created_at, 'localtime'), seller_id, "
+    "coalesce(sum(amount), 0), sum(points_spent = 0), sum(points_spent > 0), "
+    "coalesce(sum(points_earned), 0), coalesce(sum(points_spent), 0) "
+    "FROM payments GROUP BY 1, 2"
+)
+
+
+class DailySalesModel:
+    @staticmethod
+    async def get_since(day: str) -> list:
+        """Строки сводки начиная с дня day (YYYY-MM-DD): (DailySales, имя продавца)"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(DailySales, func.coalesce(User.profile_name, User.username, User.first_name))
+                .join(User, User.id == DailySales.seller_id)
+                .where(DailySales.day >= day)
+            )
+            return result.all()
+
+    @staticmethod
+    async def rebuild() -> int:
+        """Пересчитать сводку из payments; возвращает количество строк сводки"""
+        async with async_session() as session:
+            await session.execute(delete(DailySales))
+            result = await session.execute(text(REBUILD_DAILY_SALES))
+            await session.commit()
+            return result.rowcount
+
+
+class PointsLedgerModel:
+    @staticmethod
+    async def create_checkpoint() -> Optional[LedgerCheckpoint]:
+        """
+        Контрольная точка журнала баллов: балансы всех пользователей по журналу.
+        Считается от предыдущей точки по хвосту журнала, а не по всей истории.
+        None - с прошлой точки журнал не менялся.
+        """
+        async with async_session() as session:
+            previous = (await session.execute(
+                select(LedgerCheckpoint).order_by(LedgerCheckpoint.id.desc()).limit(1)
+            )).scalar_one_or_none()
+            previous_ledger_id = previous.ledger_id if previous else 0
+            last_ledger_id = (await session.execute(text("SELECT max(id) FROM points_ledger"))).scalar() or 0
+            if last_ledger_id == previous_ledger_id:
+                return None
+
+            checkpoint = LedgerCheckpoint(ledger_id=last_ledger_id)
+            session.add(checkpoint)
+            await session.flush()
+            await session.execute(
+                text(
+                    "INSERT INTO checkpoint_balances (checkpoint_id, user_id, balance) "
+                    "SELECT :checkpoint_id, user_id, sum(delta) FROM ("
+                    "  SELECT user_id, balance AS delta FROM checkpoint_balances WHERE checkpoint_id = :previous_id"
+                    "  UNION ALL"
+                    "  SELECT user_id, delta FROM points_ledger WHERE id > :previous_ledger_id AND id <= :last_ledger_id"
+                    ") GROUP BY user_id HAVING sum(delta) != 0"
+                ),
+                {
+                    'checkpoint_id': checkpoint.id,
+                    'previous_id': previous.id if previous else 0,
+                    'previous_ledger_id': previous_ledger_id,
+                    'last_ledger_id': last_ledger_id,
+                }
+            )
+            # Балансы старых точек больше не нужны - храним только предыдущую
+            if previous:
+                await session.execute(
+                    delete(CheckpointBalance).where(CheckpointBalance.checkpoint_id < previous.id)
+                )
+            await session.commit()
+            return checkpoint
+
+    @staticmethod
+    async def audit() -> dict:
+        """
+        Сверка users.loyalty_points с журналом: баланс последней контрольной точки
+        плюс хвост журнала после неё. Возвращает
+        {'tail': записей в хвосте, 'mismatches': [(telegram_id, в users, по журналу), ...]} (сотые).
+        """
+        async with async_session() as session:
+            checkpoint = (await session.execute(
+                select(LedgerCheckpoint).order_by(LedgerCheckpoint.id.desc()).limit(1)
+            )).scalar_one_or_none()
+            params = {
+                'checkpoint_id': checkpoint.id if checkpoint else 0,
+                'ledger_id': checkpoint.ledger_id if checkpoint else 0,
+            }
+            tail = (await session.execute(
+                text("SELECT count(*) FROM points_ledger WHERE id > :ledger_id"), params
+            )).scalar()
+            result = await session.execute(
+                text(
+                    "SELECT telegram_id, stored, expected FROM ("
+                    "  SELECT u.telegram_id, CAST(round(coalesce(u.loyalty_points, 0) * 100) AS INTEGER) AS stored,"
+                    "         coalesce(cb.balance, 0) + coalesce(t.delta, 0) AS expected"
+                    "  FROM users u"
+                    "  LEFT JOIN checkpoint_balances cb ON cb.checkpoint_id = :checkpoint_id AND cb.user_id = u.id"
+                    "  LEFT JOIN (SELECT user_id, sum(delta) AS delta FROM points_ledger"
+                    "             WHERE id > :ledger_id GROUP BY user_id) t ON t.user_id = u.id"
+                    ") WHERE stored != expected"
+                ),
+                params
+            )
+            return {'tail': tail, 'mismatches': [tuple(row) for row in result]}
+
+
+def _export_queries() -> dict:
+    """Выгрузки для админов: заголовок CSV и запрос только нужных колонок"""
+    client = aliased(User)
+    seller = aliased(User)
+    return {
+        'users': (
+            ['id', 'telegram_id', 'username', 'first_name', 'last_name', 'profile_name', 'phone_number',
+             'birth_date', 'role', 'loyalty_points', 'is_registered', 'is_active', 'created_at'],
+            select(User.id, User.telegram_id, User.username, User.first_name, User.last_name,
+                   User.profile_name, User.phone_number, User.birth_date, User.role,
+                   User.loyalty_points, User.is_registered, User.is_active, User.created_at)
+            .order_by(User.id)
+        ),
+        'payments': (
+            ['id', 'created_at', 'client_telegram_id', 'client_name', 'seller_telegram_id', 'seller_name',
+             'amount', 'points_earned', 'points_spent', 'description'],
+            select(Payment.id, Payment.created_at,
+                   client.telegram_id, func.coalesce(client.profile_name, client.first_name, client.username),
+                   seller.telegram_id, func.coalesce(seller.first_name, seller.username),
+                   Payment.amount, Payment.points_earned, Payment.points_spent, Payment.description)
+            .join(client, client.id == Payment.client_id)
+            .outerjoin(seller, seller.id == Payment.seller_id)
+            .order_by(Payment.id)
+        ),
+        'points': (
+            ['id', 'created_at', 'telegram_id', 'kind', 'points', 'payment_id'],
+            select(PointsLedger.id, PointsLedger.created_at, User.telegram_id, PointsLedger.kind,
+                   PointsLedger.delta / 100.0, PointsLedger.payment_id)
+            .join(User, User.id == PointsLedger.user_id)
+            .order_by(PointsLedger.id)
+        ),
+    }
+
+
+EXPORTS = _export_queries()
+
+
+class ExportModel:
+    @staticmethod
+    def header(kind: str) -> list:
+        return EXPORTS[kind][0]
+
+    @staticmethod
+    async def iter_rows(kind: str, chunk_size: int = 1000):
+        """
+        Асинхронный итератор строк выгрузки kind пачками по chunk_size.
+        Строки читаются курсором по мере обработки - в памяти не больше одной пачки.
+        """
+        query = EXPORTS[kind][1].execution_options(yield_per=chunk_size)
+        async with async_session() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+
 class BroadcastModel:
     @staticmethod
-    async def create_broadcast(sender_id: int, message_text: str) -> Broadcast:
+    async def create_broadcast(sender_id: int, message_text: str,
+                               progress_chat_id: int = None, progress_message_id: int = None) -> Broadcast:
         """Создать запись о рассылке"""
         async with async_session() as session:
+            total = await session.scalar(select(func.count(User.id)).where(User.is_active == True))
             broadcast = Broadcast(
                 sender_id=sender_id,
-                message_text=message_text
+                message_text=message_text,
+                status='running',
+                total_count=total,
+                progress_chat_id=progress_chat_id,
+                progress_message_id=progress_message_id
             )
             session.add(broadcast)
             await session.commit()
             await session.refresh(broadcast)
             return broadcast
-    
+
     @staticmethod
     async def update_sent_count(broadcast_id: int, count: int):
         """Обновить количество отправленных сообщений"""
@@ -137,3 +579,240 @@ class BroadcastModel:
                 broadcast.sent_count = count
                 await session.commit()
 
+    @staticmethod
+    async def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+        """Получить рассылку по id"""
+        async with async_session() as session:
+            return await session.get(Broadcast, broadcast_id)
+
+    @staticmethod
+    async def get_unfinished_broadcasts() -> List[Broadcast]:
+        """Рассылки, прерванные перезапуском бота"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(Broadcast).where(Broadcast.status == 'running').order_by(Broadcast.id)
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def abandon_sending(broadcast_id: int) -> int:
+        """
+        Пометить получателей, отправка которым шла в момент остановки, как 'unknown'.
+        Им сообщение повторно не отправляется (доставка не более одного раза).
+        """
+        async with async_session() as session:
+            result = await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.broadcast_id == broadcast_id,
+                       BroadcastDelivery.status == 'sending')
+                .values(status='unknown')
+            )
+            await session.commit()
+            return result.rowcount
+
+    @staticmethod
+    async def get_pending(broadcast_id: int) -> List[int]:
+        """Получатели, взятые в работу, но ещё не начатые (остаток пачки после перезапуска)"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(BroadcastDelivery.telegram_id)
+                .where(BroadcastDelivery.broadcast_id == broadcast_id,
+                       BroadcastDelivery.status == 'pending')
+            )
+            return list(result.scalars().all())
+
+    @staticmethod
+    async def claim_batch(broadcast_id: int, batch_size: int) -> List[int]:
+        """
+        Взять в работу следующую пачку получателей (keyset по users.id).
+        В одной транзакции: записи 'pending' в журнал доставки и сдвиг курсора.
+        """
+        async with async_session() as session:
+            broadcast = await session.get(Broadcast, broadcast_id)
+            if not broadcast or broadcast.status != 'running':
+                return []
+            rows = (await session.execute(
+                recipients_query(broadcast.last_user_id or 0, batch_size)
+            )).all()
+            if not rows:
+                return []
+            await session.execute(
+                insert(BroadcastDelivery).prefix_with('OR IGNORE'),
+                [{'broadcast_id': broadcast_id, 'telegram_id': telegram_id, 'status': 'pending'}
+                 for _, telegram_id in rows]
+            )
+            broadcast.last_user_id = rows[-1][0]
+            await session.commit()
+            return [telegram_id for _, telegram_id in rows]
+
+    @staticmethod
+    async def mark_sending(broadcast_id: int, telegram_ids: List[int]):
+        """Отметить начало отправки волне получателей одним UPDATE"""
+        async with async_session() as session:
+            await session.execute(
+                update(BroadcastDelivery)
+                .where(BroadcastDelivery.broadcast_id == broadcast_id,
+                       BroadcastDelivery.telegram_id.in_(telegram_ids))
+                .values(status='sending')
+            )
+            await session.commit()
+
+    @staticmethod
+    async def record_results(broadcast_id: int, sent_ids: List[int], failed_ids: List[int]):
+        """Записать накопленные результаты отправки и увеличить счётчики одной транзакцией"""
+        async with async_session() as session:
+            for status, ids in (('sent', sent_ids), ('failed', failed_ids)):
+                if ids:
+                    await session.execute(
+                        update(BroadcastDelivery)
+                        .where(BroadcastDelivery.broadcast_id == broadcast_id,
+                               BroadcastDelivery.telegram_id.in_(ids))
+                        .values(status=status)
+                    )
+            await session.execute(
+                update(Broadcast)
+                .where(Broadcast.id == broadcast_id)
+                .values(sent_count=Broadcast.sent_count + len(sent_ids),
+                        failed_count=Broadcast.failed_count + len(failed_ids))
+            )
+            await session.commit()
+
+    @staticmethod
+    async def complete_broadcast(broadcast_id: int):
+        """Пометить рассылку завершённой"""
+        async with async_session() as session:
+            await session.execute(
+                update(Broadcast).where(Broadcast.id == broadcast_id).values(status='done')
+            )
+            await session.commit()
+
+
+# Кэш активного сообщения ДР (сбрасывается при изменении настроек)
+_birthday_message_cache = {}
+
+
+class BirthdayMessageModel:
+    @staticmethod
+    async def get_birthday_message() -> Optional[BirthdayMessage]:
+        """Получить текущее сообщение для рассылки в день рождения"""
+        if 'active' in _birthday_message_cache:
+            return _birthday_message_cache['active']
+        async with async_session() as session:
+            result = await session.execute(
+                select(BirthdayMessage).where(BirthdayMessage.is_active == True)
+            )
+            msg = result.scalars().first()
+            _birthday_message_cache['active'] = msg
+            return msg
+
+    @staticmethod
+    async def update_birthday_message(message_text: str, photo_file_id: str = None) -> BirthdayMessage:
+        """Обновить сообщение для рассылки в день рождения"""
+        async with async_session() as session:
+            # Ищем существующее сообщение
+            result = await session.execute(
+                select(BirthdayMessage).where(BirthdayMessage.is_active == True)
+            )
+            msg = result.scalars().first()
+
+            if msg:
+                # Обновляем существующее
+                msg.message_text = message_text
+                if photo_file_id is not None:
+                    msg.photo_file_id = photo_file_id
+                msg.updated_at = datetime.utcnow()
+            else:
+                # Создаём новое
+                msg = BirthdayMessage(
+                    message_text=message_text,
+                    photo_file_id=photo_file_id,
+                    is_active=True
+                )
+                session.add(msg)
+
+            await session.commit()
+            _birthday_message_cache.clear()
+            return msg
+
+    @staticmethod
+    async def set_birthday_message(message_text: str, photo_file_id: str = None) -> BirthdayMessage:
+        """Установить сообщение для рассылки в день рождения (deprecated, используйте update_birthday_message)"""
+        return await BirthdayMessageModel.update_birthday_message(message_text, photo_file_id)
+
+    @staticmethod
+    async def get_active_message() -> Optional[BirthdayMessage]:
+        """Получить активное сообщение для дня рождения"""
+        return await BirthdayMessageModel.get_birthday_message()
+
+
+class MediaFileModel:
+    @staticmethod
+    async def get_media_file(path: str) -> Optional[MediaFile]:
+        """Получить сохранённый file_id для локального файла"""
+        async with async_session() as session:
+            return await session.get(MediaFile, path)
+
+    @staticmethod
+    async def save_media_file(path: str, content_hash: str, file_id: str):
+        """Сохранить file_id загруженного файла"""
+        async with async_session() as session:
+            media = await session.get(MediaFile, path)
+            if media:
+                media.content_hash = content_hash
+                media.file_id = file_id
+                media.updated_at = datetime.utcnow()
+            else:
+                session.add(MediaFile(path=path, content_hash=content_hash, file_id=file_id))
+            await session.commit()
+
+    @staticmethod
+    async def delete_media_file(path: str):
+        """Удалить сохранённый file_id"""
+        async with async_session() as session:
+            media = await session.get(MediaFile, path)
+            if media:
+                await session.delete(media)
+                await session.commit()
+
+
+class SessionStateModel:
+    @staticmethod
+    async def load(kind: str, owner_id: int) -> Optional[str]:
+        """Сохранённое состояние диалога (JSON) пользователя или чата"""
+        async with async_session() as session:
+            result = await session.execute(
+                select(SessionState.data).where(
+                    SessionState.kind == kind, SessionState.owner_id == owner_id
+                )
+            )
+            return result.scalar_one_or_none()
+
+    @staticmethod
+    async def save_many(changes: dict):
+        """
+        Записать пачку состояний одной транзакцией.
+        changes: {(kind, owner_id): JSON или None - удалить}
+        """
+        now = datetime.utcnow()
+        rows = [
+            {'kind': kind, 'owner_id': owner_id, 'data': data, 'updated_at': now}
+            for (kind, owner_id), data in changes.items() if data is not None
+        ]
+        removed = [key for key, data in changes.items() if data is None]
+        async with async_session() as session:
+            if rows:
+                stmt = sqlite_insert(SessionState)
+                await session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=['kind', 'owner_id'],
+                        set_={'data': stmt.excluded.data, 'updated_at': stmt.excluded.updated_at}
+                    ),
+                    rows
+                )
+            for kind, owner_id in removed:
+                await session.execute(
+                    delete(SessionState).where(
+                        SessionState.kind == kind, SessionState.owner_id == owner_id
+                    )
+                )
+            await session.commit()
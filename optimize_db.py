@@ -1,39 +1,20 @@
 #!/usr/bin/env python3
 """
-Оптимизация базы данных - добавление индексов для ускорения запросов
+Оптимизация базы данных - дефрагментация и обновление статистики.
+Индексы создаются миграциями схемы (migrations.py) при старте бота.
 """
 
-import sqlite3
+import storage
 import sys
 
 def optimize_database(db_path='korejapy_bot.db'):
     """Оптимизация базы данных"""
     try:
-        conn = sqlite3.connect(db_path)
+        conn = storage.connect(db_path)
         cursor = conn.cursor()
         
         print("🚀 Оптимизация базы данных...")
         
-        # Добавляем индексы для таблицы users
-        indexes = [
-            ("idx_users_telegram_id", "CREATE INDEX IF NOT EXISTS idx_users_telegram_id ON users(telegram_id)"),
-            ("idx_users_username", "CREATE INDEX IF NOT EXISTS idx_users_username ON users(username)"),
-            ("idx_users_phone", "CREATE INDEX IF NOT EXISTS idx_users_phone ON users(phone_number)"),
-            ("idx_users_role", "CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)"),
-            ("idx_users_birth_date", "CREATE INDEX IF NOT EXISTS idx_users_birth_date ON users(birth_date)"),
-            ("idx_payments_client", "CREATE INDEX IF NOT EXISTS idx_payments_client ON payments(client_id)"),
-            ("idx_payments_seller", "CREATE INDEX IF NOT EXISTS idx_payments_seller ON payments(seller_id)"),
-        ]
-        
-        created = 0
-        for idx_name, query in indexes:
-            try:
-                cursor.execute(query)
-                print(f"  ✅ Индекс {idx_name} создан")
-                created += 1
-            except Exception as e:
-                print(f"  ℹ️ Индекс {idx_name} уже существует")
-        
         # VACUUM - оптимизация и дефрагментация БД
         print("\n🔧 Выполняю VACUUM (дефрагментация)...")
         cursor.execute("VACUUM")
@@ -51,7 +32,6 @@ def optimize_database(db_path='korejapy_bot.db'):
         
         print(f"\n✅ Оптимизация завершена!")
         print(f"📦 Размер БД: {size_mb:.2f} МБ")
-        print(f"🎯 Создано индексов: {created}")
         
         conn.close()
         return True
@@ -0,0 +1,195 @@
+"""
+Операции с баллами и оплатами, выполняемые одной транзакцией.
+Каждое изменение баланса пишется в журнал points_ledger целыми сотыми балла,
+users.loyalty_points - материализованный баланс журнала (всегда кратен 0.01).
+"""
+
+from sqlalchemy import update, insert, select, func, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import date, datetime
+from typing import Optional
+
+from database import async_session, User, Payment, DailySales, PointsLedger
+from models import to_cents
+from user_cache import user_cache
+
+
+def _client_name():
+    """Имя клиента для ответа продавцу - возвращается тем же UPDATE, без отдельного чтения"""
+    return func.coalesce(User.profile_name, User.first_name).label('name')
+
+
+def _balance_cents():
+    """Баланс пользователя в сотых (loyalty_points - материализованный баланс журнала)"""
+    return func.round(func.coalesce(User.loyalty_points, 0) * 100)
+
+
+async def _add_to_daily_sales(session, seller_id: int, amount: float = 0,
+                              points_earned: float = 0, points_spent: float = 0):
+    """Обновить сводку продаж за сегодня в той же транзакции, что и оплату"""
+    is_spend = 1 if points_spent else 0
+    stmt = sqlite_insert(DailySales).values(
+        day=date.today().isoformat(),
+        seller_id=seller_id,
+        amount=amount,
+        payments_count=1 - is_spend,
+        spends_count=is_spend,
+        points_earned=points_earned,
+        points_spent=points_spent
+    )
+    await session.execute(stmt.on_conflict_do_update(
+        index_elements=['day', 'seller_id'],
+        set_={
+            'amount': DailySales.amount + stmt.excluded.amount,
+            'payments_count': DailySales.payments_count + stmt.excluded.payments_count,
+            'spends_count': DailySales.spends_count + stmt.excluded.spends_count,
+            'points_earned': DailySales.points_earned + stmt.excluded.points_earned,
+            'points_spent': DailySales.points_spent + stmt.excluded.points_spent,
+        }
+    ))
+
+
+class PaymentService:
+    @staticmethod
+    async def record_payment(client_telegram_id: int, seller_telegram_id: int, amount: float,
+                             points: float, description: str = None) -> Optional[tuple]:
+        """
+        Начислить баллы и записать оплату одной транзакцией.
+        Баланс увеличивается в SQL (без гонок между продавцами).
+        Возвращает (новый баланс, имя клиента) или None, если клиент не найден.
+        """
+        try:
+            async with async_session() as session:
+                cents = to_cents(points)
+                client = (await session.execute(
+                    update(User)
+                    .where(User.telegram_id == client_telegram_id)
+                    .values(loyalty_points=(_balance_cents() + cents) / 100.0)
+                    .returning(User.id, User.loyalty_points, _client_name())
+                    .execution_options(synchronize_session=False)
+                )).first()
+                if not client:
+                    await session.rollback()
+                    return None
+
+                seller_id = select(User.id).where(User.telegram_id == seller_telegram_id).scalar_subquery()
+                payment = (await session.execute(
+                    insert(Payment).values(
+                        client_id=client.id,
+                        seller_id=seller_id,
+                        amount=amount,
+                        points_earned=cents / 100,
+                        points_spent=0,
+                        description=description
+                    ).returning(Payment.id, Payment.seller_id)
+                )).first()
+                if cents:
+                    await session.execute(insert(PointsLedger).values(
+                        user_id=client.id, delta=cents, kind='earn', payment_id=payment.id
+                    ))
+                await _add_to_daily_sales(session, payment.seller_id, amount=amount, points_earned=cents / 100)
+                await session.commit()
+                return client.loyalty_points, client.name
+        finally:
+            user_cache.invalidate(client_telegram_id)
+
+    @staticmethod
+    async def spend_points(client_telegram_id: int, seller_telegram_id: int, points: float,
+                           description: str = None) -> Optional[tuple]:
+        """
+        Списать баллы одним условным UPDATE ... RETURNING и записать списание в payments.
+        Возвращает (остаток баллов, имя клиента) или None, если клиент не найден
+        или баллов недостаточно.
+        """
+        try:
+            async with async_session() as session:
+                cents = to_cents(points)
+                client = (await session.execute(
+                    update(User)
+                    .where(User.telegram_id == client_telegram_id,
+                           _balance_cents() >= cents)
+                    .values(loyalty_points=(_balance_cents() - cents) / 100.0)
+                    .returning(User.id, User.loyalty_points, _client_name())
+                    .execution_options(synchronize_session=False)
+                )).first()
+                if not client:
+                    await session.rollback()
+                    return None
+
+                seller_id = select(User.id).where(User.telegram_id == seller_telegram_id).scalar_subquery()
+                payment = (await session.execute(
+                    insert(Payment).values(
+                        client_id=client.id,
+                        seller_id=seller_id,
+                        amount=0,
+                        points_earned=0,
+                        points_spent=cents / 100,
+                        description=description
+                    ).returning(Payment.id, Payment.seller_id)
+                )).first()
+                if cents:
+                    await session.execute(insert(PointsLedger).values(
+                        user_id=client.id, delta=-cents, kind='spend', payment_id=payment.id
+                    ))
+                await _add_to_daily_sales(session, payment.seller_id, points_spent=cents / 100)
+                await session.commit()
+                return client.loyalty_points, client.name
+        finally:
+            user_cache.invalidate(client_telegram_id)
+
+    @staticmethod
+    async def expire_points(cutoff: datetime, after_user_id: int = 0,
+                            batch_size: int = 500) -> Optional[tuple]:
+        """
+        Сжечь баллы, начисленные раньше cutoff, у следующей пачки клиентов (keyset по users.id).
+        Списания расходуют самые старые начисления, поэтому сгорает
+        (начислено до cutoff) - (всего списано и сожжено ранее), но не больше баланса.
+        Одна транзакция на пачку. Возвращает (последний users.id пачки, клиентов в пачке,
+        [(telegram_id, сгорело сотых, новый баланс), ...]) или None, если клиенты кончились.
+        """
+        affected = []
+        try:
+            async with async_session() as session:
+                user_ids = (await session.execute(
+                    select(User.id)
+                    .where(User.id > after_user_id, User.loyalty_points > 0)
+                    .order_by(User.id)
+                    .limit(batch_size)
+                )).scalars().all()
+                if not user_ids:
+                    return None
+
+                params = {
+                    'after': after_user_id,
+                    'upto': user_ids[-1],
+                    'cutoff': cutoff.strftime('%Y-%m-%d %H:%M:%S'),
+                    'now': str(datetime.utcnow()),
+                }
+                # Сгорание считается и записывается в журнал одним INSERT ... SELECT
+                expired = (await session.execute(text(
+                    "INSERT INTO points_ledger (user_id, delta, kind, created_at) "
+                    "SELECT l.user_id, -min(l.expirable, CAST(round(u.loyalty_points * 100) AS INTEGER)), 'expire', :now "
+                    "FROM ("
+                    "  SELECT user_id,"
+                    "         sum(CASE WHEN delta > 0 AND created_at < :cutoff THEN delta ELSE 0 END)"
+                    "         + sum(CASE WHEN delta < 0 THEN delta ELSE 0 END) AS expirable"
+                    "  FROM points_ledger WHERE user_id > :after AND user_id <= :upto GROUP BY user_id"
+                    ") l JOIN users u ON u.id = l.user_id "
+                    "WHERE l.expirable > 0 AND u.loyalty_points > 0 "
+                    "RETURNING id, user_id, delta"
+                ), params)).all()
+                if expired:
+                    deltas = {row.user_id: -row.delta for row in expired}
+                    params['first_id'] = min(row.id for row in expired)
+                    result = await session.execute(text(
+                        "UPDATE users SET loyalty_points = (round(coalesce(users.loyalty_points, 0) * 100) + e.delta) / 100.0 "
+                        "FROM (SELECT user_id, delta FROM points_ledger WHERE id >= :first_id AND kind = 'expire') e "
+                        "WHERE users.id = e.user_id "
+                        "RETURNING users.id, users.telegram_id, users.loyalty_points"
+                    ), params)
+                    affected = [(row.telegram_id, deltas[row.id], row.loyalty_points) for row in result]
+                await session.commit()
+                return user_ids[-1], len(user_ids), affected
+        finally:
+            for telegram_id, _, _ in affected:
+                user_cache.invalidate(telegram_id)
@@ -0,0 +1,139 @@
+"""
+Хранение незавершённых диалогов (user_data / chat_data) в базе бота.
+Изменения копятся в памяти и пишутся одной транзакцией раз в интервал
+и при остановке бота; состояние пользователя читается из базы лениво,
+при первом обращении к нему после перезапуска.
+"""
+
+import asyncio
+import json
+import logging
+import os
+from telegram.ext import BasePersistence, PersistenceInput
+
+from models import SessionStateModel
+
+logger = logging.getLogger(__name__)
+
+# Интервал записи накопленных изменений, секунд
+PERSISTENCE_INTERVAL = float(os.getenv('PERSISTENCE_INTERVAL', '10'))
+
+
+def _dump(data: dict):
+    """Компактный JSON; пустое состояние не храним (None - удалить строку)"""
+    if not data:
+        return None
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+class DBPersistence(BasePersistence):
+    """Персистентность PTB поверх таблицы session_state"""
+
+    def __init__(self, update_interval: float = PERSISTENCE_INTERVAL):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, callback_data=False),
+            update_interval=update_interval,
+        )
+        self._pending = {}  # (kind, owner_id) -> JSON или None
+        self._writing = {}  # то же, но уже в текущей транзакции записи
+        self._restored = set()  # (kind, owner_id), уже прочитанные из базы
+        self._write_task = None
+        self._lock = asyncio.Lock()
+
+    # --- Чтение ---
+
+    async def get_user_data(self):
+        # Ничего не загружаем при старте - см. refresh_user_data
+        return {}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name: str):
+        return {}
+
+    async def _restore(self, kind: str, owner_id: int, data: dict):
+        key = (kind, owner_id)
+        if key in self._restored:
+            return
+        self._restored.add(key)
+        if key in self._pending or key in self._writing:
+            # Свежее состояние ещё не записано - база устарела
+            stored = self._pending.get(key, self._writing.get(key))
+        else:
+            stored = await SessionStateModel.load(kind, owner_id)
+        if stored:
+            for name, value in json.loads(stored).items():
+                data.setdefault(name, value)
+
+    async def refresh_user_data(self, user_id: int, user_data: dict):
+        await self._restore('user', user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict):
+        await self._restore('chat', chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    def forget(self, kind: str, owner_id: int):
+        """Состояние выгружено из памяти - при следующем обращении прочитать заново"""
+        self._restored.discard((kind, owner_id))
+
+    # --- Запись (write-behind) ---
+
+    def _mark(self, kind: str, owner_id: int, data):
+        self._pending[(kind, owner_id)] = data
+        self._restored.add((kind, owner_id))
+        if self._write_task is None or self._write_task.done():
+            # PTB вызывает update_* для всех изменённых записей разом -
+            # запись стартует после них и уходит одной транзакцией
+            self._write_task = asyncio.create_task(self._write())
+
+    async def _write(self):
+        async with self._lock:
+            if not self._pending:
+                return
+            self._writing, self._pending = self._pending, {}
+            try:
+                await SessionStateModel.save_many(self._writing)
+            except Exception as e:
+                logger.error(f"Ошибка сохранения состояния диалогов: {e}")
+                # Вернуть в очередь, не затирая более свежие изменения
+                for key, data in self._writing.items():
+                    self._pending.setdefault(key, data)
+            finally:
+                self._writing = {}
+
+    async def update_user_data(self, user_id: int, data: dict):
+        self._mark('user', user_id, _dump(data))
+
+    async def update_chat_data(self, chat_id: int, data: dict):
+        self._mark('chat', chat_id, _dump(data))
+
+    async def drop_user_data(self, user_id: int):
+        self._mark('user', user_id, None)
+
+    async def drop_chat_data(self, chat_id: int):
+        self._mark('chat', chat_id, None)
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name: str, key, new_state):
+        pass
+
+    async def flush(self):
+        """Записать всё накопленное (вызывается PTB при остановке)"""
+        if self._write_task is not None:
+            await self._write_task
+        await self._write()
+        logger.info("Состояние диалогов сохранено")
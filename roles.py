@@ -0,0 +1,66 @@
+"""
+Индекс ролей персонала в памяти процесса.
+Проверки прав не ходят в базу: индекс загружается при старте бота
+и обновляется на месте при каждой смене роли (UserModel.update_role).
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Персонал, назначаемый автоматически по username при /start
+ADMIN_USERNAMES = ['flooooooooooowy', 'katrinzagora']
+SELLER_USERNAMES = ['fublat_666', 'shad0w_04', 'mikk4u']
+# Telegram ID, которые всегда имеют права админа
+ADMIN_IDS = frozenset(int(id.strip()) for id in os.getenv('ADMIN_IDS', '').split(',') if id.strip())
+
+STAFF_ROLES = ('creator', 'admin', 'seller')
+
+
+class RoleIndex:
+    """Множества telegram_id персонала по ролям и username для автоназначения"""
+
+    def __init__(self):
+        self.admin_usernames = frozenset(u.lower() for u in ADMIN_USERNAMES)
+        self.seller_usernames = frozenset(u.lower() for u in SELLER_USERNAMES)
+        self._ids = {role: frozenset() for role in STAFF_ROLES}
+
+    def load(self, staff):
+        """Заполнить индекс парами (telegram_id, role) из таблицы users"""
+        ids = {role: set() for role in STAFF_ROLES}
+        for telegram_id, role in staff:
+            if role in ids:
+                ids[role].add(telegram_id)
+        self._ids = {role: frozenset(members) for role, members in ids.items()}
+
+    def set_role(self, telegram_id: int, role: str):
+        """Отразить смену роли пользователя"""
+        self._ids = {
+            staff_role: (members | {telegram_id}) if staff_role == role else (members - {telegram_id})
+            for staff_role, members in self._ids.items()
+        }
+
+    def role(self, telegram_id: int) -> str:
+        """Роль для проверки прав (ADMIN_IDS - минимум админ)"""
+        if telegram_id in self._ids['creator']:
+            return 'creator'
+        if telegram_id in self._ids['admin'] or telegram_id in ADMIN_IDS:
+            return 'admin'
+        if telegram_id in self._ids['seller']:
+            return 'seller'
+        return 'client'
+
+    def username_role(self, username: str):
+        """Роль, назначаемая по username ('admin', 'seller' или None)"""
+        if not username:
+            return None
+        username = username.lower()
+        if username in self.admin_usernames:
+            return 'admin'
+        if username in self.seller_usernames:
+            return 'seller'
+        return None
+
+
+role_index = RoleIndex()
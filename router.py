@@ -0,0 +1,63 @@
+"""
+Маршрутизация диалогов: одно состояние на пользователя, обработчики в словарях,
+требуемая роль объявляется для маршрута и проверяется не более одного раза за апдейт
+"""
+
+from typing import Callable, NamedTuple, Optional
+
+# Ключ состояния диалога в context.user_data
+STATE_KEY = 'state'
+
+# Уровни доступа ролей
+ROLE_LEVELS = {'client': 0, 'seller': 1, 'admin': 2, 'creator': 3}
+
+
+class Route(NamedTuple):
+    handler: Callable
+    role: Optional[str] = None  # Минимальная роль (None - доступно всем)
+
+
+def get_state(context) -> Optional[str]:
+    """Текущее состояние диалога пользователя"""
+    return context.user_data.get(STATE_KEY)
+
+
+def set_state(context, state: Optional[str]):
+    """Перевести пользователя в состояние (None - выйти из диалога)"""
+    if state is None:
+        context.user_data.pop(STATE_KEY, None)
+    else:
+        context.user_data[STATE_KEY] = state
+
+
+class RoleCheck:
+    """Роль пользователя, загружаемая лениво и не более одного раза за апдейт"""
+
+    _UNSET = object()
+
+    def __init__(self, user_id: int, load_role):
+        self.user_id = user_id
+        self._load_role = load_role
+        self._role = self._UNSET
+
+    async def role(self) -> Optional[str]:
+        if self._role is self._UNSET:
+            self._role = await self._load_role(self.user_id)
+        return self._role
+
+    async def allows(self, required: Optional[str]) -> bool:
+        if required is None:
+            return True
+        return ROLE_LEVELS.get(await self.role(), -1) >= ROLE_LEVELS[required]
+
+
+async def dispatch(routes: dict, key, update, context, roles: RoleCheck) -> bool:
+    """
+    Найти маршрут по ключу (состояние или callback_data) и вызвать обработчик.
+    Возвращает False, если маршрута нет или роли недостаточно.
+    """
+    route = routes.get(key)
+    if route is None or not await roles.allows(route.role):
+        return False
+    await route.handler(update, context)
+    return True
@@ -0,0 +1,191 @@
+"""
+Массовая отправка сообщений с ограничением скорости под лимиты Telegram
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import logging
+from telegram.error import RetryAfter
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Telegram: ~30 сообщений в секунду на бота и не чаще 1 сообщения в секунду в один чат
+SEND_RATE_PER_SECOND = float(os.getenv('SEND_RATE_PER_SECOND', '25'))
+SEND_PER_CHAT_INTERVAL = float(os.getenv('SEND_PER_CHAT_INTERVAL', '1.0'))
+SEND_CONCURRENCY = int(os.getenv('SEND_CONCURRENCY', '16'))
+SEND_MAX_RETRIES = 3
+
+
+class TokenBucket:
+    """Token bucket для asyncio"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _reserve(self) -> float:
+        """Забрать токен; вернуть сколько нужно подождать (0 если токен получен)"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        """Дождаться токена"""
+        while True:
+            delay = self._reserve()
+            if delay <= 0:
+                return
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Остановить выдачу токенов (например, после RetryAfter)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+
+
+class RateLimiter:
+    """Общий лимит бота + минимальный интервал между сообщениями в один чат"""
+
+    def __init__(self, rate: float = SEND_RATE_PER_SECOND,
+                 per_chat_interval: float = SEND_PER_CHAT_INTERVAL):
+        self.bucket = TokenBucket(rate)
+        self.per_chat_interval = per_chat_interval
+        self._next_for_chat = {}
+
+    def _reserve_chat(self, chat_id: int) -> float:
+        now = time.monotonic()
+        if len(self._next_for_chat) > 10000:
+            self._next_for_chat = {
+                cid: t for cid, t in self._next_for_chat.items() if t > now
+            }
+        start = max(now, self._next_for_chat.get(chat_id, 0.0))
+        self._next_for_chat[chat_id] = start + self.per_chat_interval
+        return start - now
+
+    async def wait(self, chat_id: int):
+        """Дождаться разрешения на отправку в чат"""
+        delay = self._reserve_chat(chat_id)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await self.bucket.acquire()
+
+    def pause(self, seconds: float):
+        self.bucket.pause(seconds)
+
+
+# Общий лимитер для всех массовых отправок процесса
+rate_limiter = RateLimiter()
+
+
+class SendStats:
+    """Счётчики массовой отправки"""
+
+    def __init__(self):
+        self.sent = 0
+        self.failed = 0
+        self.started = time.monotonic()
+
+    @property
+    def processed(self) -> int:
+        return self.sent + self.failed
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rate(self) -> float:
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+
+async def send_with_retry(send, chat_id: int, limiter: RateLimiter = rate_limiter,
+                          max_retries: int = SEND_MAX_RETRIES, **kwargs):
+    """Отправить сообщение с учётом лимитов и повтором после RetryAfter"""
+    for attempt in range(max_retries + 1):
+        await limiter.wait(chat_id)
+        try:
+            return await send(chat_id=chat_id, **kwargs)
+        except RetryAfter as e:
+            if attempt == max_retries:
+                raise
+            logger.warning(f"RetryAfter {e.retry_after} с. для {chat_id}")
+            limiter.pause(e.retry_after)
+
+
+async def _iterate(chat_ids):
+    """Единый асинхронный обход списка, итератора или асинхронного итератора"""
+    if hasattr(chat_ids, '__aiter__'):
+        async for chat_id in chat_ids:
+            yield chat_id
+    else:
+        for chat_id in chat_ids:
+            yield chat_id
+
+
+async def send_many(send, chat_ids, on_result=None, on_progress=None,
+                    progress_interval: float = 3.0, concurrency: int = SEND_CONCURRENCY,
+                    limiter: RateLimiter = rate_limiter, **kwargs) -> SendStats:
+    """
+    Отправить сообщение списку чатов параллельно в пределах лимитов.
+    chat_ids может быть (асинхронным) итератором - получатели читаются по мере отправки.
+    on_result(chat_id, result, error) вызывается для каждого получателя (может быть корутиной),
+    on_progress(stats) (корутина) - не чаще раза в progress_interval секунд.
+    """
+    stats = SendStats()
+    last_progress = time.monotonic()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def send_one(chat_id):
+        nonlocal last_progress
+        try:
+            result = await send_with_retry(send, chat_id, limiter, **kwargs)
+            error = None
+            stats.sent += 1
+        except Exception as e:
+            result = None
+            error = e
+            stats.failed += 1
+            logger.debug(f"Не удалось отправить {chat_id}: {e}")
+        finally:
+            semaphore.release()
+        if on_result:
+            outcome = on_result(chat_id, result, error)
+            if inspect.isawaitable(outcome):
+                await outcome
+        if on_progress and time.monotonic() - last_progress >= progress_interval:
+            last_progress = time.monotonic()
+            try:
+                await on_progress(stats)
+            except Exception as e:
+                logger.error(f"Ошибка обновления прогресса: {e}")
+
+    try:
+        async for chat_id in _iterate(chat_ids):
+            await semaphore.acquire()
+            task = asyncio.create_task(send_one(chat_id))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+    except asyncio.CancelledError:
+        # Отмена рассылки (остановка бота) - начатые отправки тоже отменяем
+        for task in list(tasks):
+            task.cancel()
+        raise
+    return stats
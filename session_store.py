@@ -0,0 +1,120 @@
+"""
+Ограничение памяти под состояния пользователей и чатов (user_data / chat_data).
+PTB держит словарь для каждого, кто хоть раз написал боту; здесь неактивные
+записи выгружаются из памяти по времени простоя и по лимиту количества.
+Незавершённые диалоги при этом не теряются - они лежат в базе (persistence.py)
+и подгружаются при следующем обращении.
+"""
+
+import logging
+import os
+import sys
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SESSION_IDLE_TTL = float(os.getenv('SESSION_IDLE_TTL', '600'))  # секунд простоя до выгрузки
+SESSION_MAX = int(os.getenv('SESSION_MAX', '10000'))  # максимум отслеживаемых записей (пользователи + чаты)
+SESSION_SWEEP_INTERVAL = float(os.getenv('SESSION_SWEEP_INTERVAL', '60'))
+
+
+def _approx_size(data: dict) -> int:
+    """Примерный размер словаря состояния в байтах (без глубокой рекурсии)"""
+    size = sys.getsizeof(data)
+    for key, value in data.items():
+        size += sys.getsizeof(key) + sys.getsizeof(value)
+    return size
+
+
+class SessionStore:
+    """Учёт активности user_data / chat_data приложения и их выгрузка"""
+
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL, max_sessions: int = SESSION_MAX):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.application = None
+        self._last_seen = OrderedDict()  # (kind, owner_id) -> time.monotonic()
+        self.evicted = 0
+
+    def attach(self, application):
+        self.application = application
+
+    async def touch(self, update, context):
+        """Отметить активность (TypeHandler, группа -1 - до остальных обработчиков)"""
+        now = time.monotonic()
+        if update.effective_user:
+            self._seen(('user', update.effective_user.id), now)
+        if update.effective_chat:
+            self._seen(('chat', update.effective_chat.id), now)
+
+    def _seen(self, key, now: float):
+        self._last_seen[key] = now
+        self._last_seen.move_to_end(key)
+        if len(self._last_seen) > self.max_sessions:
+            # Лимит превышен - выгружаем самую давнюю запись
+            # (если её изменения ещё не сохранены - её выгрузит sweep)
+            self._evict(next(iter(self._last_seen)))
+
+    def _evict(self, key) -> bool:
+        """Выгрузить запись из памяти; False если её ещё нужно сохранить"""
+        app = self.application
+        kind, owner_id = key
+        if kind == 'user':
+            data, unsaved = app._user_data, app._user_ids_to_be_updated_in_persistence
+        else:
+            data, unsaved = app._chat_data, app._chat_ids_to_be_updated_in_persistence
+        if app.persistence and owner_id in unsaved:
+            # Изменения ещё не переданы в persistence - подождём следующего прохода
+            return False
+        data.pop(owner_id, None)
+        self._last_seen.pop(key, None)
+        if app.persistence and hasattr(app.persistence, 'forget'):
+            app.persistence.forget(kind, owner_id)
+        self.evicted += 1
+        return True
+
+    def evict_idle(self) -> int:
+        """Выгрузить записи без активности дольше idle_ttl"""
+        deadline = time.monotonic() - self.idle_ttl
+        evicted = 0
+        for key, seen in list(self._last_seen.items()):
+            if seen > deadline:
+                break  # дальше только более свежие
+            if self._evict(key):
+                evicted += 1
+
+        # Записи без отметки активности (например, созданные до подключения учёта)
+        app = self.application
+        for kind, data in (('user', app._user_data), ('chat', app._chat_data)):
+            for owner_id in [i for i in data if (kind, i) not in self._last_seen]:
+                if self._evict((kind, owner_id)):
+                    evicted += 1
+        return evicted
+
+    def stats(self) -> dict:
+        """Счётчики: живые записи, примерный объём в байтах, всего выгружено"""
+        app = self.application
+        users = list(app._user_data.values())
+        chats = list(app._chat_data.values())
+        return {
+            'users': len(users),
+            'chats': len(chats),
+            'bytes': sum(_approx_size(d) for d in users) + sum(_approx_size(d) for d in chats),
+            'evicted': self.evicted,
+        }
+
+    async def sweep(self, context):
+        """Периодическая задача: выгрузить неактивные записи и записать счётчики в лог"""
+        evicted = self.evict_idle()
+        stats = self.stats()
+        logger.info(
+            f"Сессии: пользователей {stats['users']}, чатов {stats['chats']}, "
+            f"~{stats['bytes'] / 1024:.1f} КБ, выгружено сейчас {evicted}, всего {stats['evicted']}"
+        )
+
+
+session_store = SessionStore()
@@ -0,0 +1,76 @@
+"""
+Профиль хранилища SQLite: PRAGMA для каждого соединения и настройки пула
+"""
+
+import os
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# PRAGMA, применяемые к каждому новому соединению
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000')),
+    'cache_size': int(os.getenv('SQLITE_CACHE_SIZE', '-20000')),  # отрицательное значение - в КиБ
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', str(128 * 1024 * 1024))),
+    'temp_store': os.getenv('SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# Размер пула соединений
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '5'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+# Профиль можно отключить (например, для сравнения в бенчмарке)
+STORAGE_PROFILE_ENABLED = os.getenv('STORAGE_PROFILE', '1') != '0'
+
+
+def apply_pragmas(dbapi_connection, pragmas: dict = None):
+    """Применить PRAGMA к DBAPI-соединению (sqlite3 или адаптер aiosqlite)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in (pragmas or SQLITE_PRAGMAS).items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def engine_options(url: str, enabled: bool = STORAGE_PROFILE_ENABLED) -> dict:
+    """Параметры create_async_engine для профиля хранилища"""
+    if not enabled or not url.startswith('sqlite') or ':memory:' in url:
+        return {}
+    return {
+        'poolclass': AsyncAdaptedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT,
+        'pool_pre_ping': False,
+    }
+
+
+def install(engine, enabled: bool = STORAGE_PROFILE_ENABLED):
+    """Подключить профиль к движку: PRAGMA на каждом новом соединении пула"""
+    if not enabled or engine.dialect.name != 'sqlite':
+        return engine
+    sync_engine = getattr(engine, 'sync_engine', engine)
+
+    @event.listens_for(sync_engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection)
+
+    return engine
+
+
+def connect(db_path: str = 'korejapy_bot.db') -> sqlite3.Connection:
+    """
+    Прямое sqlite3-соединение с тем же профилем (для служебных скриптов
+    миграций и обслуживания, работающих вне бота)
+    """
+    conn = sqlite3.connect(db_path, timeout=SQLITE_PRAGMAS['busy_timeout'] / 1000)
+    if STORAGE_PROFILE_ENABLED:
+        apply_pragmas(conn)
+    return conn
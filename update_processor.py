@@ -0,0 +1,61 @@
+"""
+Параллельная обработка апдейтов.
+По умолчанию PTB обрабатывает апдейты строго по одному, и любой запрос к базе
+или Telegram задерживает всех остальных. Здесь апдейты разных пользователей
+обрабатываются параллельно (до MAX_CONCURRENT_UPDATES), а апдейты одного
+пользователя - по очереди: шаги диалога читают и меняют context.user_data,
+и двойное нажатие или повторная отправка суммы не должны выполниться дважды.
+"""
+
+import asyncio
+import os
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '32'))
+
+
+def _owner(update):
+    """Ключ очереди апдейта: пользователь, иначе чат (None - без очереди)"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_user:
+        return ('user', update.effective_user.id)
+    if update.effective_chat:
+        return ('chat', update.effective_chat.id)
+    return None
+
+
+class PerUserUpdateProcessor(BaseUpdateProcessor):
+    """Параллельно между пользователями, последовательно для одного пользователя"""
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES):
+        super().__init__(max_concurrent_updates)
+        self._locks = {}  # ключ -> [asyncio.Lock, апдейтов в работе и в очереди]
+
+    async def do_process_update(self, update, coroutine):
+        key = _owner(update)
+        if key is None:
+            await coroutine
+            return
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                await coroutine
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                # Замки держим только для пользователей с апдейтами в работе
+                del self._locks[key]
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,68 @@
+"""
+Кэш пользователей в памяти процесса (LRU + время жизни записей)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+load_dotenv()
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '2048'))
+USER_CACHE_TTL = float(os.getenv('USER_CACHE_TTL', '300'))
+
+
+class UserCache:
+    """LRU-кэш пользователей по telegram_id с ограничением времени жизни"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, telegram_id: int):
+        """Получить пользователя из кэша (None если нет или запись устарела)"""
+        with self._lock:
+            entry = self._data.get(telegram_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._data[telegram_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(telegram_id)
+            self.hits += 1
+            return user
+
+    def put(self, telegram_id: int, user):
+        """Положить пользователя в кэш (вытесняя самые старые записи)"""
+        if self.maxsize <= 0 or user is None:
+            return
+        with self._lock:
+            self._data[telegram_id] = (time.monotonic() + self.ttl, user)
+            self._data.move_to_end(telegram_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        """Удалить пользователя из кэша"""
+        with self._lock:
+            self._data.pop(telegram_id, None)
+
+    def clear(self):
+        """Очистить кэш"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+user_cache = UserCache()